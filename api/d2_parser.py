@@ -0,0 +1,154 @@
+"""
+D2 topology parser
+Python port of window.parseD2ToGraph (src/utils/d2Parser.js) so the API can
+hand the frontend a ready-made graph instead of raw D2 text
+"""
+
+import re
+from typing import Dict, List, Optional
+
+INTERFACE_HINTS = ("port", "ethernet", "channel", "gigabit", "lag")
+
+def _split_property(trimmed: str):
+    """Split a 'key: "value"' line the way the frontend parser does"""
+    parts = trimmed.split(":")
+    key = parts[0].strip()
+    value = parts[1].strip() if len(parts) > 1 else ""
+    return key, value.replace('"', "")
+
+def parse_d2_to_graph(d2_string: str) -> Dict:
+    """Parse D2 text into nodes, links and interface configurations.
+
+    Mirrors the frontend parser line for line, so the result can replace a
+    client-side parseD2ToGraph call. Interfaces are keyed by
+    "device.interface" in a plain dict instead of a Map.
+    """
+    nodes: Dict[str, Dict] = {}
+    links: List[Dict] = []
+    interfaces: Dict[str, Dict] = {}
+
+    current_device_id: Optional[str] = None
+    current_interface_id: Optional[str] = None
+    current_svi_id: Optional[str] = None
+    is_in_device_def = False
+    is_in_interface_def = False
+    is_in_svi_def = False
+    brace_depth = 0
+
+    for line in d2_string.split("\n"):
+        trimmed = line.strip()
+        if not trimmed or trimmed.startswith("#"):
+            continue
+
+        # Count braces to track nesting depth
+        brace_depth += trimmed.count("{") - trimmed.count("}")
+        lowered = trimmed.lower()
+
+        # Device definition start (top-level object with label/type)
+        if ": {" in trimmed and brace_depth == 1 and "->" not in trimmed and "/" not in trimmed:
+            current_device_id = trimmed.split(":")[0].strip()
+            is_in_device_def = True
+            is_in_interface_def = False
+            is_in_svi_def = False
+
+        # Interface definition (nested under device)
+        elif (": {" in trimmed and brace_depth == 2 and current_device_id
+              and ("/" in trimmed or any(hint in lowered for hint in INTERFACE_HINTS))):
+            current_interface_id = trimmed.split(":")[0].strip()
+            current_svi_id = None
+            is_in_interface_def = True
+            is_in_svi_def = False
+            full_interface_key = f"{current_device_id}.{current_interface_id}"
+
+            if full_interface_key not in interfaces:
+                interfaces[full_interface_key] = {
+                    "device": current_device_id,
+                    "interface": current_interface_id,
+                    "config": {}
+                }
+
+        # SVI definition (nested under device, starts with vlan)
+        elif ": {" in trimmed and brace_depth == 2 and current_device_id and lowered.startswith("vlan"):
+            current_svi_id = trimmed.split(":")[0].strip()
+            current_interface_id = None
+            is_in_svi_def = True
+            is_in_interface_def = False
+
+            if current_device_id in nodes:
+                nodes[current_device_id]["device"].setdefault("svis", {})[current_svi_id] = {}
+
+        # Extract device properties
+        elif (is_in_device_def and not is_in_interface_def and not is_in_svi_def
+              and brace_depth >= 1 and ":" in trimmed and "{" not in trimmed):
+            if trimmed.startswith("label:"):
+                label_match = re.search(r'label:\s*"([^"]+)"', trimmed)
+                label = label_match.group(1) if label_match else current_device_id
+
+                if current_device_id and current_device_id not in nodes:
+                    nodes[current_device_id] = {
+                        "id": current_device_id,
+                        "label": label,
+                        "device": {},
+                        "type": "unknown"
+                    }
+            elif trimmed.startswith("type:"):
+                type_match = re.search(r'type:\s*"([^"]+)"', trimmed) or re.search(r'type:\s*(\w+)', trimmed)
+                if current_device_id in nodes:
+                    nodes[current_device_id]["type"] = type_match.group(1) if type_match else "unknown"
+            # Dynamically capture any other device properties
+            else:
+                key, value = _split_property(trimmed)
+                if current_device_id in nodes:
+                    nodes[current_device_id]["device"][key] = value
+
+        # Extract interface configuration
+        elif is_in_interface_def and brace_depth >= 2 and ":" in trimmed and "{" not in trimmed:
+            interface_data = interfaces.get(f"{current_device_id}.{current_interface_id}")
+            if interface_data:
+                key, value = _split_property(trimmed)
+                interface_data["config"][key] = value
+
+        # Extract SVI configuration
+        elif is_in_svi_def and brace_depth >= 2 and ":" in trimmed and "{" not in trimmed:
+            key, value = _split_property(trimmed)
+            if current_device_id in nodes and current_svi_id:
+                svis = nodes[current_device_id]["device"].setdefault("svis", {})
+                svis.setdefault(current_svi_id, {})[key] = value
+
+        # Connection definitions (simple format)
+        elif "->" in trimmed and "{" not in trimmed and ":" not in trimmed:
+            source, target = [part.strip() for part in trimmed.split("->")[:2]]
+            if source and target:
+                # Extract device names and interfaces from full references
+                source_device, _, source_interface = source.partition(".")
+                target_device, _, target_interface = target.partition(".")
+
+                if source_device and target_device:
+                    links.append({
+                        "source": source_device,
+                        "target": target_device,
+                        "sourceInterface": source_interface,
+                        "targetInterface": target_interface,
+                        "sourceInterfaceKey": source,
+                        "targetInterfaceKey": target
+                    })
+
+        # Reset when we exit definitions
+        if brace_depth == 0:
+            is_in_device_def = False
+            is_in_interface_def = False
+            is_in_svi_def = False
+            current_device_id = None
+            current_interface_id = None
+            current_svi_id = None
+        elif brace_depth == 1:
+            is_in_interface_def = False
+            is_in_svi_def = False
+            current_interface_id = None
+            current_svi_id = None
+
+    return {
+        "nodes": list(nodes.values()),
+        "links": links,
+        "interfaces": interfaces
+    }
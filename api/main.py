@@ -4,21 +4,59 @@ Serves D2 files and provides network topology data
 """
 
 import os
+import asyncio
+import hashlib
+import ipaddress
+import json
+import time
 import aiofiles
-from fastapi import FastAPI, HTTPException, Request
+import aiofiles.os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.openapi.docs import get_swagger_ui_html
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import re
 from datetime import datetime
+from d2_parser import parse_d2_to_graph
+from site_store import SiteMetadataStore
+from response_cache import EncodedBody, ResponseCache, dumps_json, negotiate_encoding
+from regeneration import RegenerationJobs
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry, RequestMetricsMiddleware
+from tracing import TracingMiddleware, span
+from search_index import SearchIndex
+from topology import SiteTopology
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    from watchfiles import DefaultFilter, awatch
+except ImportError:  # watchfiles ships with uvicorn[standard]
+    awatch = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the site index on startup and keep it fresh while the API runs"""
+    watcher = None
+    if SITES_DIR.exists():
+        await site_index.refresh()
+        if awatch is not None:
+            watcher = asyncio.create_task(watch_sites(site_index))
+        else:
+            print("⚠️ watchfiles not installed, sites will be rescanned per request")
+    yield
+    if watcher is not None:
+        watcher.cancel()
 
 app = FastAPI(
     title="Network Topology API",
     description="API for serving network topology data from D2 files",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware for development
@@ -39,6 +77,87 @@ app.mount("/sites", StaticFiles(directory=PROJECT_ROOT / "sites"), name="sites")
 
 SITES_DIR = PROJECT_ROOT / "sites"
 
+# Serialized (and compressed) response bodies, keyed by ETag
+RESPONSE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+# In-process metrics, served in Prometheus text format at /api/metrics
+metrics = MetricsRegistry()
+request_latency = metrics.histogram(
+    "api_request_duration_seconds", "API request latency by route template",
+    ("method", "route", "status")
+)
+response_bytes = metrics.counter("api_response_bytes_total", "Response body bytes served", ("route",))
+scan_duration = metrics.histogram(
+    "site_scan_duration_seconds", "Time spent scanning or re-indexing the sites tree", ("operation",)
+)
+scan_files_read = metrics.histogram(
+    "site_scan_files_read", ".d2 files read per scan or re-index", ("operation",),
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000)
+)
+files_read = metrics.counter("d2_files_read_total", ".d2 files read from disk")
+bytes_read = metrics.counter("d2_bytes_read_total", "Characters of .d2 content read from disk")
+combine_duration = metrics.histogram(
+    "d2_combine_duration_seconds", "Time spent combining a multi-file site with its device files"
+)
+cache_lookups = metrics.counter(
+    "cache_lookups_total", "Response, graph and topology cache lookups by result", ("cache", "result")
+)
+app.add_middleware(RequestMetricsMiddleware, latency=request_latency, response_bytes=response_bytes)
+# Server-Timing on every response, and the span tree with ?trace=1
+app.add_middleware(TracingMiddleware)
+
+# Files read by the scan running in the current context (see measure_scan)
+scan_reads: ContextVar[Optional[List[int]]] = ContextVar("scan_reads", default=None)
+
+@contextmanager
+def measure_scan(operation: str):
+    """Record the duration of a scan and how many .d2 files it read"""
+    reads = [0]
+    token = scan_reads.set(reads)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        scan_reads.reset(token)
+        scan_duration.observe(time.perf_counter() - started, operation=operation)
+        scan_files_read.observe(reads[0], operation=operation)
+
+# Persistent metadata index used for fast cold starts
+SITE_INDEX_DB = Path(os.environ.get("SITE_INDEX_DB", PROJECT_ROOT / ".site-index.sqlite3"))
+
+# Bounds for site scanning: directory listings and stats run on this pool,
+# and at most SCAN_READ_CONCURRENCY .d2 files are read at the same time
+SCAN_WORKERS = 16
+SCAN_READ_CONCURRENCY = 64
+scan_pool = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="site-scan")
+_read_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+def read_semaphore() -> asyncio.Semaphore:
+    """The scan read semaphore for the running event loop, created on first use.
+
+    asyncio primitives bind to the first loop that waits on them, so one
+    created at import would fail under any other loop (tests, benchmarks).
+    """
+    global _read_semaphore
+    loop = asyncio.get_running_loop()
+    if _read_semaphore is None or _read_semaphore[0] is not loop:
+        _read_semaphore = (loop, asyncio.Semaphore(SCAN_READ_CONCURRENCY))
+    return _read_semaphore[1]
+
+async def read_d2_file(path: Path) -> str:
+    """Read a .d2 file, bounded by the scan read semaphore"""
+    with span("read", path.name):
+        async with read_semaphore():
+            async with aiofiles.open(path, mode='r') as f:
+                content = await f.read()
+    files_read.inc()
+    bytes_read.inc(len(content))
+    reads = scan_reads.get()
+    if reads is not None:
+        reads[0] += 1
+    return content
+
 def extract_site_metadata(d2_content: str, filename: str) -> Dict:
     """Extract metadata from D2 file content and filename"""
     lines = d2_content.split('\n')
@@ -87,7 +206,8 @@ def extract_site_metadata(d2_content: str, filename: str) -> Dict:
     
     return metadata
 
-async def combine_multi_file_site(site_dir: Path, main_d2_content: str) -> str:
+async def combine_multi_file_site(site_dir: Path, main_d2_content: str,
+                                  device_files: Optional[List[Path]] = None) -> str:
     """Combine main.d2 with individual device files for multi-file sites"""
     try:
         combined_content = []
@@ -116,28 +236,23 @@ async def combine_multi_file_site(site_dir: Path, main_d2_content: str) -> str:
             
             combined_content.append(line)
         
-        # Find and read all individual device files
-        # Check both the site directory and a devices/ subdirectory
-        device_dirs = [site_dir, site_dir / "devices"]
+        # Read all individual device files
+        if device_files is None:
+            device_files = find_device_files(site_dir)
+        
+        device_contents = await asyncio.gather(
+            *(read_d2_file(device_file) for device_file in device_files),
+            return_exceptions=True
+        )
         
-        for device_dir in device_dirs:
-            if not device_dir.exists():
+        for device_file, device_content in zip(device_files, device_contents):
+            if isinstance(device_content, Exception):
+                print(f"Warning: Could not read device file {device_file}: {device_content}")
                 continue
-                
-            for device_file in device_dir.glob("*.d2"):
-                if device_file.name == "main.d2":
-                    continue
-                    
-                try:
-                    async with aiofiles.open(device_file, mode='r') as f:
-                        device_content = await f.read()
-                    
-                    device_files_found.append(device_file.name)
-                    combined_content.append(f"\n# === {device_file.name} ===")
-                    combined_content.append(device_content)
-                    
-                except Exception as e:
-                    print(f"Warning: Could not read device file {device_file}: {e}")
+            
+            device_files_found.append(device_file.name)
+            combined_content.append(f"\n# === {device_file.name} ===")
+            combined_content.append(device_content)
         
         result = '\n'.join(combined_content)
         print(f"✅ Combined main.d2 with {len(device_files_found)} device files: {device_files_found}")
@@ -165,6 +280,11 @@ async def api_documentation():
     """Redirect to interactive API documentation"""
     return RedirectResponse(url="/docs")
 
+@app.get("/api/metrics")
+async def get_metrics() -> Response:
+    """Process metrics in the Prometheus text exposition format"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
@@ -175,90 +295,723 @@ async def health_check():
         "sites_exists": SITES_DIR.exists()
     }
 
-async def scan_sites_recursive(base_path: Path, current_path: Path = None) -> Dict:
-    """Recursively scan for sites with hierarchical structure"""
+def normalize_key_part(part: str) -> str:
+    """Normalize a path component into a site key segment"""
+    return part.replace(' ', '_').replace('-', '_').lower()
+
+def list_directory(path: Path) -> Tuple[List[Path], List[Path]]:
+    """List a directory's .d2 files and subdirectories in a single scandir pass"""
+    d2_files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    subdirs.append(Path(entry.path))
+                elif entry.name.endswith(".d2"):
+                    d2_files.append(Path(entry.path))
+    except OSError as e:
+        print(f"Warning: Could not list {path}: {e}")
+    return sorted(d2_files), sorted(subdirs)
+
+def find_device_files(site_dir: Path) -> List[Path]:
+    """List the device .d2 files that belong to a multi-file site"""
+    d2_files, subdirs = list_directory(site_dir)
+    device_files = [path for path in d2_files if path.name != "main.d2"]
+    # Check both the site directory and a devices/ subdirectory
+    devices_dir = site_dir / "devices"
+    if devices_dir in subdirs:
+        device_files += [path for path in list_directory(devices_dir)[0] if path.name != "main.d2"]
+    return device_files
+
+def describe_single_file_site(base_path: Path, d2_file: Path) -> Tuple[str, Dict]:
+    """Build the site key and source description for a standalone .d2 file"""
+    # Create site key with hierarchy (e.g., "amer.big_branch" or just "big_branch")
+    relative_path = d2_file.relative_to(base_path)
+    path_parts = [normalize_key_part(part) for part in relative_path.parts]
+    site_key = '.'.join(path_parts[:-1] + [Path(path_parts[-1]).stem])
+    
+    return site_key, {
+        "type": "single_file",
+        "path": d2_file,
+        "site_dir": None,
+        "files": [d2_file]
+    }
+
+def describe_multi_file_site(base_path: Path, site_dir: Path,
+                             device_files: Optional[List[Path]] = None) -> Tuple[str, Dict]:
+    """Build the site key and source description for a main.d2 site folder"""
+    main_d2 = site_dir / "main.d2"
+    relative_path = main_d2.relative_to(base_path)
+    path_parts = [normalize_key_part(part) for part in relative_path.parts[:-1]]
+    site_key = '.'.join(path_parts)
+    
+    if device_files is None:
+        device_files = find_device_files(site_dir)
+    
+    return site_key, {
+        "type": "multi_file",
+        "path": main_d2,
+        "site_dir": site_dir,
+        "files": [main_d2] + device_files
+    }
+
+def discover_sites(base_path: Path, current_path: Path = None) -> Dict[str, Dict]:
+    """Walk the sites tree and describe each site's files without reading them.
+    
+    Blocking: callers on the event loop should run it in a worker thread.
+    Each level of the tree is listed concurrently on the scan thread pool,
+    so a slow filesystem costs one round trip per level, not per directory.
+    """
     if current_path is None:
         current_path = base_path
     
-    sites = {}
+    # List the tree breadth-first, one thread pool batch per level
+    listings = {}
+    leaf_dirs = set()
+    pending = [current_path]
+    while pending:
+        results = list(scan_pool.map(list_directory, pending))
+        next_level = []
+        for directory, (d2_files, subdirs) in zip(pending, results):
+            listings[directory] = (d2_files, subdirs)
+            if directory in leaf_dirs:
+                continue
+            if directory != current_path and directory / "main.d2" in d2_files:
+                # Inside a site folder only devices/ matters
+                devices_dirs = [subdir for subdir in subdirs if subdir.name == "devices"]
+                leaf_dirs.update(devices_dirs)
+                next_level += devices_dirs
+            else:
+                next_level += subdirs
+        pending = next_level
+    
+    sources = {}
+    
+    def collect(directory: Path):
+        d2_files, subdirs = listings[directory]
+        
+        # Single-file sites: .d2 files in the current directory
+        for d2_file in d2_files:
+            site_key, source = describe_single_file_site(base_path, d2_file)
+            sources[site_key] = source
+        
+        # Multi-file sites: subdirectories with a main.d2
+        for subdir in subdirs:
+            sub_files, sub_dirs = listings[subdir]
+            if subdir / "main.d2" in sub_files:
+                device_files = [path for path in sub_files if path.name != "main.d2"]
+                devices_dir = subdir / "devices"
+                if devices_dir in sub_dirs:
+                    device_files += [path for path in listings[devices_dir][0] if path.name != "main.d2"]
+                site_key, source = describe_multi_file_site(base_path, subdir, device_files)
+                sources[site_key] = source
+            else:
+                # Recursively collect subdirectories that don't have main.d2 (region folders)
+                collect(subdir)
     
-    # Scan for .d2 files in current directory
-    for d2_file in current_path.glob("*.d2"):
+    collect(current_path)
+    return sources
+
+def file_signature(files: List[Path]) -> Optional[Tuple]:
+    """Build a cheap change signature from the mtime and size of each file"""
+    signature = []
+    for path in files:
         try:
-            async with aiofiles.open(d2_file, mode='r') as f:
-                content = await f.read()
+            stat = path.stat()
+        except OSError:
+            return None
+        signature.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def file_signatures(sources: Dict[str, Dict]) -> Dict[str, Optional[Tuple]]:
+    """Stat the files of many sites concurrently on the scan thread pool (blocking)"""
+    keys = list(sources)
+    signatures = scan_pool.map(file_signature, [sources[key]["files"] for key in keys])
+    return dict(zip(keys, signatures))
+
+def signature_etag(signature: Tuple, variant: str = "") -> str:
+    """Derive a strong ETag from file signatures without reading file bodies"""
+    digest = hashlib.sha1(repr((signature, variant)).encode()).hexdigest()
+    return f'"{digest}"'
+
+def signature_last_modified(signature: Tuple) -> Optional[float]:
+    """Latest mtime (in seconds) among the files of a signature"""
+    mtimes = [mtime_ns for _, mtime_ns, _ in signature]
+    return max(mtimes) / 1e9 if mtimes else None
+
+def validator_headers(etag: str, last_modified: Optional[float]) -> Dict[str, str]:
+    """Response headers that let clients revalidate instead of re-downloading"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current validators"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence and uses weak comparison
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return int(last_modified) <= since
+    return False
+
+async def cached_json_response(request: Request, etag: str, last_modified: Optional[float],
+                               build_content) -> Response:
+    """Serve a JSON body from the response cache, honouring conditional requests.
+    
+    Bodies are keyed by their ETag, serialized once and compressed once per
+    Content-Encoding, so repeated requests for unchanged data only copy bytes.
+    build_content is an async callable that is only awaited on a cache miss.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    cache_key = etag
+    if encoding != "identity":
+        # Each content coding is a distinct representation with its own ETag
+        etag = f'{etag[:-1]}-{encoding}"'
+    
+    headers = validator_headers(etag, last_modified)
+    headers["Vary"] = "Accept-Encoding"
+    if is_not_modified(request, etag, last_modified):
+        cache_lookups.inc(cache="response", result="not_modified")
+        return Response(status_code=304, headers=headers)
+    
+    body = response_cache.get(cache_key)
+    cache_lookups.inc(cache="response", result="miss" if body is None else "hit")
+    if body is None:
+        with span("build"):
+            content = await build_content()
+        with span("encode"):
+            body = EncodedBody(await asyncio.to_thread(dumps_json, content))
+        response_cache.put(cache_key, body)
+    with span("compress", encoding):
+        payload = await body.get(encoding)
+    
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+async def load_site(base_path: Path, source: Dict) -> Dict:
+    """Read a discovered site from disk and build its API representation"""
+    main_file = source["path"]
+    content = await read_d2_file(main_file)
+    last_modified = datetime.fromtimestamp((await aiofiles.os.stat(main_file)).st_mtime).isoformat()
+    
+    relative_path = main_file.relative_to(base_path)
+    
+    if source["type"] == "multi_file":
+        subdir = source["site_dir"]
+        with span("metadata", subdir.name):
+            metadata = extract_site_metadata(content, subdir.name)
+        # Use directory name for multi-file sites
+        metadata["name"] = subdir.name.replace('-', ' ').replace('_', ' ').title()
+        metadata["last_modified"] = last_modified
+        metadata["type"] = "multi_file"
+        metadata["hierarchy"] = list(relative_path.parts[:-2])  # Path without site name and main.d2
+        
+        # For multi-file sites, combine main.d2 with individual device files
+        with combine_duration.time(), span("combine", subdir.name):
+            d2 = await combine_multi_file_site(subdir, content, source["files"][1:])
+    else:
+        with span("metadata", main_file.name):
+            metadata = extract_site_metadata(content, main_file.name)
+        # Use filename (without extension) for single files
+        metadata["name"] = main_file.stem.replace('-', ' ').replace('_', ' ').title()
+        metadata["last_modified"] = last_modified
+        metadata["hierarchy"] = list(relative_path.parts[:-1])  # Path without filename
+        d2 = content
+    
+    return {
+        "site_info": metadata,
+        "d2": d2,
+        "file_path": str(relative_path)
+    }
+
+async def scan_sites_recursive(base_path: Path, current_path: Path = None) -> Dict:
+    """Recursively scan for sites with hierarchical structure"""
+    with measure_scan("scan"):
+        with span("discover"):
+            sources = await asyncio.to_thread(discover_sites, base_path, current_path)
+        loaded = await asyncio.gather(
+            *(load_site(base_path, source) for source in sources.values()),
+            return_exceptions=True
+        )
+    
+    sites = {}
+    for (site_key, source), site_data in zip(sources.items(), loaded):
+        if isinstance(site_data, Exception):
+            print(f"Error reading {source['path']}: {site_data}")
+            continue
+        sites[site_key] = site_data
+    
+    return sites
+
+async def iter_scanned_sites(base_path: Path, max_in_flight: int = SCAN_READ_CONCURRENCY):
+    """Scan the sites tree, yielding (site_key, site_data) as each site finishes loading"""
+    with span("discover"):
+        sources = await asyncio.to_thread(discover_sites, base_path)
+    pending_sources = iter(sources.items())
+    in_flight = {}
+    
+    def schedule():
+        for site_key, source in pending_sources:
+            task = asyncio.create_task(load_site(base_path, source))
+            in_flight[task] = (site_key, source)
+            if len(in_flight) >= max_in_flight:
+                return
+    
+    schedule()
+    try:
+        while in_flight:
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                site_key, source = in_flight.pop(task)
+                try:
+                    yield site_key, task.result()
+                except Exception as e:
+                    print(f"Error reading {source['path']}: {e}")
+            schedule()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+class SiteIndex:
+    """Process-wide in-memory index of scanned sites.
+    
+    Every entry remembers the mtime/size signature of the files it was built
+    from, so a refresh only rereads the sites whose files actually changed.
+    While a filesystem watcher is attached, requests are served straight from
+    memory and the watcher pushes changed paths through update_paths().
+    
+    With a metadata store, the first refresh starts from the persisted
+    metadata. Restored sites carry no D2 body until ensure_bodies() reads it.
+    """
+    
+    def __init__(self, base_path: Path, store: Optional[SiteMetadataStore] = None):
+        self.base_path = base_path
+        self.store = store
+        self.sites: Dict[str, Dict] = {}
+        self.sources: Dict[str, Dict] = {}
+        self.signatures: Dict[str, Tuple] = {}
+        self.version = 0
+        self.built = False
+        self.watching = False
+        self.graphs: Dict[str, Tuple[Tuple, Dict]] = {}
+        self.topologies: Dict[str, Tuple[Tuple, SiteTopology]] = {}
+        self.held: Dict[Path, int] = {}  # site dirs being regenerated -> number of jobs
+        self.search = SearchIndex()
+        self._search_dirty: Optional[set] = None  # sites to reindex; None until first searched
+        self._listing_signature: Tuple[int, Tuple] = (-1, ())
+        self._listing_modified: Optional[float] = None  # when the listing's file set last changed
+        self._locks: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Lock, asyncio.Lock]] = None
+    
+    def _loop_locks(self) -> Tuple[asyncio.Lock, asyncio.Lock]:
+        """The index and search locks for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        if self._locks is None or self._locks[0] is not loop:
+            self._locks = (loop, asyncio.Lock(), asyncio.Lock())
+        return self._locks[1], self._locks[2]
+    
+    @property
+    def _lock(self) -> asyncio.Lock:
+        return self._loop_locks()[0]
+    
+    @property
+    def _search_lock(self) -> asyncio.Lock:
+        return self._loop_locks()[1]
+    
+    async def get_sites(self) -> Dict[str, Dict]:
+        """Return the indexed sites, rescanning only when no watcher keeps them fresh"""
+        if self.watching and self.built:
+            return self.sites
+        return await self.refresh()
+    
+    async def get_site(self, site_key: str, with_body: bool = True) -> Optional[Dict]:
+        """Look up one site by key, revalidating only that site's files"""
+        if not self.built:
+            await self.refresh()
+        
+        if site_key not in self.sources:
+            if self.watching:
+                return None
+            # Possibly a site created since the last scan
+            await self.refresh()
+        elif not self.watching:
+            async with self._lock:
+                source = self.sources.get(site_key)
+                fresh = await asyncio.to_thread(self._redescribe, source) if source else None
+                if fresh is not None:
+                    await self._apply({site_key: fresh}, set())
             
-            # Create site key with hierarchy (e.g., "amer.big_branch" or just "big_branch")
-            relative_path = d2_file.relative_to(base_path)
-            path_parts = [part.replace(' ', '_').replace('-', '_').lower() for part in relative_path.parts]
-            site_key = '.'.join(path_parts[:-1] + [Path(path_parts[-1]).stem])
+            # The site's main file is gone; let the scope logic work out what replaced it
+            if source is not None and fresh is None:
+                await self.update_paths([source["site_dir"] or source["path"]])
+        
+        if with_body:
+            await self.ensure_bodies([site_key])
+        return self.sites.get(site_key)
+    
+    async def ensure_bodies(self, site_keys: Optional[List[str]] = None) -> None:
+        """Read the D2 bodies of sites that were restored from the metadata store"""
+        if site_keys is None:
+            site_keys = list(self.sites)
+        missing = [
+            site_key for site_key in site_keys
+            if site_key in self.sites and "d2" not in self.sites[site_key] and site_key in self.sources
+        ]
+        if not missing:
+            return
+        
+        # The watcher may install a newer entry while these reads run; only
+        # fill in entries that still lack a body and still match what was read
+        signatures = {site_key: self.signatures.get(site_key) for site_key in missing}
+        sources = {site_key: self.sources[site_key] for site_key in missing}
+        loaded = await asyncio.gather(
+            *(load_site(self.base_path, sources[site_key]) for site_key in missing),
+            return_exceptions=True
+        )
+        for site_key, site_data in zip(missing, loaded):
+            if isinstance(site_data, Exception):
+                print(f"Error reading {sources[site_key]['path']}: {site_data}")
+                continue
+            current = self.sites.get(site_key)
+            if current is not None and "d2" not in current and self.signatures.get(site_key) == signatures[site_key]:
+                self.sites[site_key] = site_data
+    
+    def _redescribe(self, source: Dict) -> Optional[Dict]:
+        """Re-list a known site's files, or None if its main file disappeared (blocking)"""
+        if not source["path"].exists():
+            return None
+        if source["type"] == "multi_file":
+            return describe_multi_file_site(self.base_path, source["site_dir"])[1]
+        return source
+    
+    def site_validators(self, site_key: str, variant: str = "") -> Tuple[str, Optional[float]]:
+        """ETag and Last-Modified for one indexed site"""
+        signature = self.signatures[site_key]
+        return signature_etag(signature, variant), signature_last_modified(signature)
+    
+    async def get_graph(self, site_key: str) -> Dict:
+        """Parsed graph for a site, reparsed only when its file signature changes"""
+        signature = self.signatures[site_key]
+        cached = self.graphs.get(site_key)
+        if cached is not None and cached[0] == signature:
+            cache_lookups.inc(cache="graph", result="hit")
+            return cached[1]
+        cache_lookups.inc(cache="graph", result="miss")
+        
+        # Parsing large sites is CPU-bound, keep it off the event loop
+        await self.ensure_bodies([site_key])
+        with span("graph", site_key):
+            graph = await asyncio.to_thread(parse_d2_to_graph, self.sites[site_key]["d2"])
+        self.graphs[site_key] = (signature, graph)
+        return graph
+    
+    async def get_topology(self, site_key: str) -> SiteTopology:
+        """Adjacency and DFS tables for a site, rebuilt only when its graph is reparsed"""
+        signature = self.signatures[site_key]
+        cached = self.topologies.get(site_key)
+        if cached is not None and cached[0] == signature:
+            cache_lookups.inc(cache="topology", result="hit")
+            return cached[1]
+        cache_lookups.inc(cache="topology", result="miss")
+        
+        graph = await self.get_graph(site_key)
+        with span("topology", site_key):
+            topology = await asyncio.to_thread(SiteTopology, graph)
+        self.topologies[site_key] = (signature, topology)
+        return topology
+    
+    async def get_search_index(self) -> SearchIndex:
+        """The search index, built over every site on first use and then only
+        updated for the sites that changed since the previous query"""
+        await self.get_sites()
+        async with self._search_lock:
+            if self._search_dirty is None:
+                pending = set(self.sites)
+            else:
+                pending = self._search_dirty
+            self._search_dirty = set()
+            if not pending:
+                return self.search
             
-            # Extract metadata
-            metadata = extract_site_metadata(content, d2_file.name)
-            # Use filename (without extension) for single files
-            metadata["name"] = d2_file.stem.replace('-', ' ').replace('_', ' ').title()
-            metadata["last_modified"] = datetime.fromtimestamp(d2_file.stat().st_mtime).isoformat()
-            metadata["hierarchy"] = list(relative_path.parts[:-1])  # Path without filename
+            for site_key in pending - set(self.sites):
+                self.search.remove_site(site_key)
+            site_keys = [site_key for site_key in self.sites if site_key in pending]
             
-            sites[site_key] = {
-                "site_info": metadata,
-                "d2": content,
-                "file_path": str(relative_path)
+            # Reuse cached graphs, parse the rest in one worker thread batch
+            graphs = {
+                site_key: self.graphs[site_key][1] for site_key in site_keys
+                if site_key in self.graphs and self.graphs[site_key][0] == self.signatures.get(site_key)
             }
-            
-        except Exception as e:
-            print(f"Error reading {d2_file}: {e}")
-            continue
+            to_parse = [site_key for site_key in site_keys if site_key not in graphs]
+            await self.ensure_bodies(to_parse)
+            bodies = [(site_key, self.signatures[site_key], self.sites[site_key]["d2"]) for site_key in to_parse
+                      if "d2" in self.sites.get(site_key, {})]
+            with span("search_index", f"{len(site_keys)} sites"):
+                parsed = await asyncio.to_thread(
+                    lambda: [(site_key, signature, parse_d2_to_graph(d2)) for site_key, signature, d2 in bodies]
+                )
+                for site_key, signature, graph in parsed:
+                    # Later /graph requests reuse these parses
+                    if self.signatures.get(site_key) == signature:
+                        self.graphs[site_key] = (signature, graph)
+                    graphs[site_key] = graph
+                for site_key, graph in graphs.items():
+                    self.search.update_site(site_key, graph)
+            print(f"🔎 Search index updated for {len(graphs)} sites")
+            return self.search
     
-    # Scan subdirectories for main.d2 files (multi-file sites)
-    for subdir in current_path.iterdir():
-        if subdir.is_dir():
-            main_d2 = subdir / "main.d2"
-            if main_d2.exists():
-                try:
-                    async with aiofiles.open(main_d2, mode='r') as f:
-                        content = await f.read()
-                    
-                    # Create hierarchical site key
-                    relative_path = main_d2.relative_to(base_path)
-                    path_parts = [part.replace(' ', '_').replace('-', '_').lower() for part in relative_path.parts[:-1]]
-                    site_key = '.'.join(path_parts)
-                    
-                    metadata = extract_site_metadata(content, subdir.name)
-                    # Use directory name for multi-file sites
-                    metadata["name"] = subdir.name.replace('-', ' ').replace('_', ' ').title()
-                    metadata["last_modified"] = datetime.fromtimestamp(main_d2.stat().st_mtime).isoformat()
-                    metadata["type"] = "multi_file"
-                    metadata["hierarchy"] = list(relative_path.parts[:-2])  # Path without site name and main.d2
-                    
-                    # For multi-file sites, combine main.d2 with individual device files
-                    combined_d2 = await combine_multi_file_site(subdir, content)
-                    
-                    sites[site_key] = {
-                        "site_info": metadata,
-                        "d2": combined_d2,
-                        "file_path": str(relative_path)
-                    }
-                    
-                except Exception as e:
-                    print(f"Error reading {main_d2}: {e}")
-                    continue
+    def listing_validators(self, variant: str = "") -> Tuple[str, Optional[float]]:
+        """ETag and Last-Modified for the whole listing, cached per index version.
+        
+        Deleting a site or a device file removes its mtime rather than adding
+        a newer one, so Last-Modified is also moved forward to the time the
+        listing's signature last changed (at least a second past the previous
+        value, since HTTP dates have one-second resolution).
+        """
+        if self._listing_signature[0] != self.version:
+            signature = tuple(self.signatures[site_key] for site_key in self.sites)
+            if signature != self._listing_signature[1] or self._listing_modified is None:
+                previous = self._listing_modified
+                self._listing_modified = time.time() if previous is None else max(time.time(), previous + 1)
+            self._listing_signature = (self.version, signature)
+        signature = self._listing_signature[1]
+        all_files = tuple(entry for site_signature in signature for entry in site_signature)
+        latest_mtime = signature_last_modified(all_files)
+        last_modified = self._listing_modified if latest_mtime is None else max(latest_mtime, self._listing_modified)
+        return signature_etag(signature, variant), last_modified
+    
+    async def refresh(self) -> Dict[str, Dict]:
+        """Bring the index up to date with the whole sites directory"""
+        async with self._lock:
+            if not self.built and self.store is not None:
+                await self._restore()
+            with measure_scan("refresh"):
+                with span("discover"):
+                    sources = await asyncio.to_thread(discover_sites, self.base_path)
+                await self._apply(sources, set(self.sources) | set(self.sites))
+            self.built = True
+            return self.sites
+    
+    async def _restore(self) -> None:
+        """Seed the index with persisted metadata so unchanged sites are not reread"""
+        rows = await asyncio.to_thread(self.store.load)
+        for site_key, row in rows.items():
+            self.sites[site_key] = {"site_info": row["site_info"], "file_path": row["file_path"]}
+            self.signatures[site_key] = row["signature"]
+        if rows:
+            print(f"💾 Restored {len(rows)} sites from {self.store.db_path}")
+    
+    def hold(self, path: Path) -> None:
+        """Ignore changes under path until release(), e.g. while a job rewrites a site"""
+        self.held[path] = self.held.get(path, 0) + 1
+    
+    def release(self, path: Path) -> None:
+        if self.held.get(path, 0) > 1:
+            self.held[path] -= 1
+        else:
+            self.held.pop(path, None)
+    
+    async def update_paths(self, paths: List[Path]) -> Dict[str, Dict]:
+        """Re-index only the sites affected by the given changed paths"""
+        paths = [path for path in paths if not any(self._in_scope(path, held) for held in self.held)]
+        if not paths:
+            return self.sites
+        async with self._lock:
+            with measure_scan("update"):
+                known_site_dirs = {source["site_dir"] for source in self.sources.values() if source["site_dir"]}
+                scopes = []
+                sources = {}
+                discovered = await asyncio.to_thread(
+                    lambda: [self._discover_scope(path, known_site_dirs) for path in paths]
+                )
+                for scope, scope_sources in discovered:
+                    if scope is None or scope in scopes:
+                        continue
+                    scopes.append(scope)
+                    sources.update(scope_sources)
+                
+                stale_keys = {
+                    site_key for site_key, source in self.sources.items()
+                    if any(self._in_scope(source["site_dir"] or source["path"], scope) for scope in scopes)
+                }
+                await self._apply(sources, stale_keys)
+                return self.sites
+    
+    def _discover_scope(self, path: Path, known_site_dirs: set) -> Tuple[Optional[Path], Dict[str, Dict]]:
+        """Find the part of the tree a changed path belongs to and rediscover just that"""
+        try:
+            relative_parts = path.relative_to(self.base_path).parts
+        except ValueError:
+            return None, {}
+        
+        # A change anywhere inside a multi-file site affects that site only
+        site_dir = self.base_path
+        for part in relative_parts:
+            site_dir = site_dir / part
+            if site_dir in known_site_dirs or (site_dir / "main.d2").exists():
+                if (site_dir / "main.d2").exists():
+                    site_key, source = describe_multi_file_site(self.base_path, site_dir)
+                    return site_dir, {site_key: source}
+                # main.d2 was removed: the folder is now a plain region
+                if site_dir.is_dir():
+                    return site_dir, discover_sites(self.base_path, site_dir)
+                return site_dir, {}
+        
+        if path.suffix == ".d2" and not path.is_dir():
+            # Single-file site created, modified or deleted
+            if not path.exists():
+                return path, {}
+            site_key, source = describe_single_file_site(self.base_path, path)
+            return path, {site_key: source}
+        
+        if path.is_dir():
+            # New region folder
+            return path, discover_sites(self.base_path, path)
+        if not path.exists():
+            # Deleted region folder (or an unrelated file; nothing will match)
+            return path, {}
+        return None, {}
+    
+    @staticmethod
+    def _in_scope(path: Path, scope: Path) -> bool:
+        """Check whether a site path lies at or below a changed path"""
+        return path == scope or scope in path.parents
+    
+    async def _apply(self, sources: Dict[str, Dict], stale_keys: set) -> None:
+        """Replace stale sources with freshly discovered ones, rereading changed sites.
+        
+        Everything is read first and swapped in afterwards without awaiting, so
+        requests see either the old or the new state of the index, never a mix.
+        """
+        # Reread only the sites whose signature changed, concurrently
+        with span("stat"):
+            signatures = await asyncio.to_thread(file_signatures, sources)
+        stale = [
+            site_key for site_key, signature in signatures.items()
+            if signature is None or self.signatures.get(site_key) != signature
+        ]
+        loaded = await asyncio.gather(
+            *(load_site(self.base_path, sources[site_key]) for site_key in stale),
+            return_exceptions=True
+        )
+        
+        changed = False
+        updated = {}
+        removed = []
+        
+        # Forget sites whose files are gone
+        for site_key in stale_keys:
+            if site_key not in sources:
+                self.sources.pop(site_key, None)
+                self.signatures.pop(site_key, None)
+                self.graphs.pop(site_key, None)
+                self.topologies.pop(site_key, None)
+                removed.append(site_key)
+                if self.sites.pop(site_key, None) is not None:
+                    changed = True
+        
+        self.sources.update(sources)
+        for site_key, site_data in zip(stale, loaded):
+            if isinstance(site_data, Exception):
+                print(f"Error reading {sources[site_key]['path']}: {site_data}")
+                self.sites.pop(site_key, None)
+                self.signatures.pop(site_key, None)
+                removed.append(site_key)
             else:
-                # Recursively scan subdirectories that don't have main.d2 (region folders)
-                recursive_sites = await scan_sites_recursive(base_path, subdir)
-                sites.update(recursive_sites)
+                self.sites[site_key] = site_data
+                self.signatures[site_key] = signatures[site_key]
+                updated[site_key] = {
+                    "signature": signatures[site_key],
+                    "site_info": site_data["site_info"],
+                    "file_path": site_data["file_path"]
+                }
+            changed = True
+        
+        if self._search_dirty is not None:
+            self._search_dirty.update(stale)
+            self._search_dirty.update(removed)
+        
+        if changed:
+            # Keep the listing in discovery order
+            self.sites = {key: self.sites[key] for key in self.sources if key in self.sites}
+            self.version += 1
+            print(f"🔄 Site index updated to version {self.version} ({len(self.sites)} sites)")
+        
+        if self.store is not None and (updated or removed):
+            await asyncio.to_thread(self.store.save, updated, removed)
+
+# Site regeneration (config parser + D2 generator) runs on its own small pool so
+# long parses never starve the scan pool
+REGEN_WORKERS = 2
+regen_pool = ThreadPoolExecutor(max_workers=REGEN_WORKERS, thread_name_prefix="site-regen")
+
+def configure_sites(sites_dir: Path, index_db: Path) -> None:
+    """Serve sites_dir with its metadata index in index_db.
     
-    return sites
+    Builds the site index and the regeneration jobs that update it together,
+    so callers that repoint the API (e.g. the benchmarks) cannot leave the
+    jobs writing to a stale index. Call before the app starts.
+    """
+    global SITES_DIR, site_index, regeneration_jobs
+    SITES_DIR = sites_dir
+    site_index = SiteIndex(sites_dir, SiteMetadataStore(index_db))
+    regeneration_jobs = RegenerationJobs(regen_pool, site_index)
 
-@app.get("/api/sites")
-async def list_sites() -> JSONResponse:
-    """List all available sites with hierarchical metadata"""
-    if not SITES_DIR.exists():
-        raise HTTPException(status_code=404, detail="Sites directory not found")
+configure_sites(SITES_DIR, SITE_INDEX_DB)
+
+# How long the watcher waits for events before yielding an empty batch; the
+# first yield shows that its filesystem watches are registered
+WATCH_TIMEOUT_MS = 1000
+
+async def watch_sites(index: SiteIndex):
+    """Keep the site index fresh from filesystem events instead of process reloads.
+    
+    Requests rescan until the watcher is running and has caught up with one
+    rescan of its own. A batch that fails to reindex is logged, and requests
+    rescan again until the next rescan succeeds.
+    """
+    default_filter = DefaultFilter()
     
-    sites = await scan_sites_recursive(SITES_DIR)
+    def watch_filter(change, path: str) -> bool:
+        # Hidden files are the config parser's temp files and manifest, not site data
+        return not os.path.basename(path).startswith(".") and default_filter(change, path)
     
-    # Build hierarchical structure for frontend
+    try:
+        async for changes in awatch(index.base_path, watch_filter=watch_filter,
+                                    rust_timeout=WATCH_TIMEOUT_MS, yield_on_timeout=True):
+            if not index.watching:
+                # Pick up whatever changed before the watches were registered
+                try:
+                    await index.refresh()
+                except Exception as e:
+                    print(f"❌ Rescanning {index.base_path} failed: {e}")
+                    continue
+                index.watching = True
+            if not changes:
+                continue
+            
+            changed_paths = sorted({Path(path) for _, path in changes})
+            print(f"👀 {len(changed_paths)} path(s) changed under {index.base_path}")
+            try:
+                await index.update_paths(changed_paths)
+            except Exception as e:
+                print(f"❌ Reindexing {len(changed_paths)} changed path(s) failed: {e}")
+                index.watching = False
+    finally:
+        index.watching = False
+
+def build_hierarchy(sites: Dict[str, Dict]) -> Dict:
+    """Build the nested region/site structure used by the frontend"""
     hierarchy = {}
     for site_key, site_data in sites.items():
         path_parts = site_key.split('.')
@@ -280,71 +1033,250 @@ async def list_sites() -> JSONResponse:
                         "children": {}
                     }
                 current_level = current_level[part]["children"]
+    return hierarchy
+
+def summarize_site(site_data: Dict) -> Dict:
+    """Strip the D2 body from a site, keeping what the tree navigation needs"""
+    return {
+        "site_info": site_data["site_info"],
+        "file_path": site_data["file_path"]
+    }
+
+@app.get("/api/sites")
+async def list_sites(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Use 'summary' to omit D2 bodies (fetch them per site)")
+) -> Response:
+    """List all available sites with hierarchical metadata"""
+    if not SITES_DIR.exists():
+        raise HTTPException(status_code=404, detail="Sites directory not found")
+    if fields not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail=f"Unknown fields mode '{fields}', expected 'full' or 'summary'")
+    
+    sites = await site_index.get_sites()
+    etag, last_modified = site_index.listing_validators(fields or "full")
+    
+    async def build_content() -> Dict:
+        if fields == "summary":
+            listed = {site_key: summarize_site(site_data) for site_key, site_data in sites.items()}
+        else:
+            await site_index.ensure_bodies()
+            # Snapshot so serialization in a worker thread never sees the index change
+            listed = dict(site_index.sites)
+        return {
+            "sites": listed,
+            "hierarchy": build_hierarchy(listed)
+        }
     
-    return JSONResponse(content={
-        "sites": sites,
-        "hierarchy": hierarchy
-    })
+    return await cached_json_response(request, etag, last_modified, build_content)
+
+# Sites whose D2 bodies are read together while streaming a restored index
+STREAM_BODY_BATCH = 32
+
+@app.get("/api/sites/stream")
+async def stream_sites(
+    fields: Optional[str] = Query(None, description="Use 'summary' to omit D2 bodies (fetch them per site)")
+) -> StreamingResponse:
+    """Stream sites as NDJSON, one line per site followed by a hierarchy record"""
+    if not SITES_DIR.exists():
+        raise HTTPException(status_code=404, detail="Sites directory not found")
+    if fields not in (None, "full", "summary"):
+        raise HTTPException(status_code=400, detail=f"Unknown fields mode '{fields}', expected 'full' or 'summary'")
+    
+    async def site_source():
+        # A built index is already in memory; otherwise stream straight off the scan
+        if site_index.built:
+            # Snapshot the listing: the watcher may add or remove sites mid-stream
+            sites = list((await site_index.get_sites()).items())
+            for start in range(0, len(sites), STREAM_BODY_BATCH):
+                batch = sites[start:start + STREAM_BODY_BATCH]
+                if fields != "summary":
+                    # Bodies restored from the metadata store are read as their batch is sent
+                    await site_index.ensure_bodies([site_key for site_key, _ in batch])
+                for site_key, _ in batch:
+                    site_data = site_index.sites.get(site_key)
+                    if site_data is not None:  # Skip sites removed since the snapshot
+                        yield site_key, site_data
+        else:
+            async for site_key, site_data in iter_scanned_sites(SITES_DIR):
+                yield site_key, site_data
+    
+    async def generate_lines():
+        # Only summaries are kept for the final hierarchy record
+        summaries = {}
+        async for site_key, site_data in site_source():
+            summaries[site_key] = summarize_site(site_data)
+            site = summaries[site_key] if fields == "summary" else site_data
+            yield json.dumps({"type": "site", "key": site_key, "site": site}) + "\n"
+        yield json.dumps({
+            "type": "hierarchy",
+            "count": len(summaries),
+            "hierarchy": build_hierarchy(summaries)
+        }) + "\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
 
 @app.get("/api/sites/{site_name}")
-async def get_site(site_name: str) -> JSONResponse:
+async def get_site(site_name: str, request: Request) -> Response:
     """Get specific site data"""
-    # Try direct .d2 file first
-    d2_file = SITES_DIR / f"{site_name.replace('_', ' ')}.d2"
+    # Any key listed by /api/sites resolves through the index, including
+    # hierarchical keys and the combined D2 of multi-file sites
+    if await site_index.get_site(site_name, with_body=False) is None:
+        raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
+    
+    async def build_content() -> Dict:
+        await site_index.ensure_bodies([site_name])
+        site_data = site_index.sites.get(site_name)
+        if site_data is None:
+            raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
+        return site_data
     
-    if not d2_file.exists():
-        # Try with underscores
-        d2_file = SITES_DIR / f"{site_name}.d2"
+    etag, last_modified = site_index.site_validators(site_name)
+    return await cached_json_response(request, etag, last_modified, build_content)
+
+@app.get("/api/sites/{site_name}/graph")
+async def get_site_graph(site_name: str, request: Request) -> Response:
+    """Get a site's parsed topology graph (nodes, links and interfaces)"""
+    if await site_index.get_site(site_name, with_body=False) is None:
+        raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
     
-    if not d2_file.exists():
-        # Try as subdirectory with main.d2
-        subdir = SITES_DIR / site_name.replace('_', '-')
-        main_d2 = subdir / "main.d2"
-        if main_d2.exists():
-            d2_file = main_d2
+    async def build_content() -> Dict:
+        return await site_index.get_graph(site_name)
     
-    if not d2_file.exists():
+    etag, last_modified = site_index.site_validators(site_name, "graph")
+    return await cached_json_response(request, etag, last_modified, build_content)
+
+@app.get("/api/sites/{site_name}/path")
+async def get_site_path(
+    site_name: str,
+    source: str = Query(..., alias="from", description="Device the path starts at"),
+    target: str = Query(..., alias="to", description="Device the path ends at")
+) -> Dict:
+    """Fewest-hop path between two devices of a site, with the interfaces of each hop"""
+    if await site_index.get_site(site_name, with_body=False) is None:
         raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
     
-    try:
-        async with aiofiles.open(d2_file, mode='r') as f:
-            content = await f.read()
-        
-        metadata = extract_site_metadata(content, d2_file.name)
-        metadata["last_modified"] = datetime.fromtimestamp(d2_file.stat().st_mtime).isoformat()
-        
-        return JSONResponse(content={
-            "site_info": metadata,
-            "d2": content,
-            "file_path": str(d2_file.relative_to(SITES_DIR))
-        })
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading site file: {str(e)}")
+    topology = await site_index.get_topology(site_name)
+    for device in (source, target):
+        if device not in topology.index:
+            raise HTTPException(status_code=404, detail=f"Device '{device}' not found in site '{site_name}'")
+    
+    hops = topology.shortest_path(source, target)
+    return {
+        "site": site_name,
+        "from": source,
+        "to": target,
+        "reachable": hops is not None,
+        "hop_count": len(hops) if hops is not None else None,
+        "hops": hops or []
+    }
+
+@app.get("/api/sites/{site_name}/impact")
+async def get_site_impact(
+    site_name: str,
+    device: Optional[str] = Query(None, description="Device whose failure (and whose links' failures) to analyse; "
+                                                     "omit for every articulation point and bridge of the site")
+) -> Dict:
+    """What a device or link failure would partition in a site"""
+    if await site_index.get_site(site_name, with_body=False) is None:
+        raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
+    
+    topology = await site_index.get_topology(site_name)
+    if device is None:
+        return {"site": site_name, **topology.summary()}
+    if device not in topology.index:
+        raise HTTPException(status_code=404, detail=f"Device '{device}' not found in site '{site_name}'")
+    return {"site": site_name, **topology.device_impact(device)}
 
 @app.get("/api/sites/{site_name}/devices/{device_name}")
-async def get_device(site_name: str, device_name: str) -> JSONResponse:
-    """Get specific device data (for future multi-file support)"""
-    # Check if site uses multi-file structure
-    site_dir = SITES_DIR / site_name.replace('_', '-')
-    device_file = site_dir / f"{device_name}.d2"
+async def get_device(site_name: str, device_name: str, request: Request) -> Response:
+    """Get specific device data from a multi-file site"""
+    if await site_index.get_site(site_name, with_body=False) is None:
+        raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
+    
+    # Device files are the indexed files after main.d2 (site folder or devices/)
+    source = site_index.sources[site_name]
+    device_file = next(
+        (path for path in source["files"][1:] if path.stem == device_name),
+        None
+    ) if source["type"] == "multi_file" else None
     
-    if not device_file.exists():
+    signature = None
+    if device_file is not None:
+        with span("stat", device_file.name):
+            signature = await asyncio.to_thread(file_signature, [device_file])
+    if signature is None:
         raise HTTPException(status_code=404, detail=f"Device '{device_name}' not found in site '{site_name}'")
+    etag, last_modified = signature_etag(signature), signature_last_modified(signature)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=validator_headers(etag, last_modified))
     
     try:
-        async with aiofiles.open(device_file, mode='r') as f:
-            content = await f.read()
+        content = await read_d2_file(device_file)
         
         return JSONResponse(content={
             "device_name": device_name,
             "d2": content,
-            "last_modified": datetime.fromtimestamp(device_file.stat().st_mtime).isoformat()
-        })
+            "last_modified": datetime.fromtimestamp(last_modified).isoformat()
+        }, headers=validator_headers(etag, last_modified))
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading device file: {str(e)}")
 
+@app.get("/api/search")
+async def search(
+    q: str = Query(..., min_length=1, description="Terms matched against device names, roles, models, "
+                                                   "interface names, descriptions and addresses; "
+                                                   "every term must match the same device, 'rlab*' matches a prefix"),
+    limit: int = Query(100, ge=1, le=1000)
+) -> Dict:
+    """Search devices and interfaces across all sites"""
+    index = await site_index.get_search_index()
+    total, results = index.search(q, limit)
+    return {"query": q, "total": total, "results": results}
+
+@app.get("/api/ip/{address}")
+async def lookup_address(address: str) -> Dict:
+    """Find the interfaces that own an address and the longest-prefix subnet containing it"""
+    try:
+        parsed = ipaddress.ip_address(address)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"'{address}' is not an IP address")
+    
+    index = await site_index.get_search_index()
+    interfaces, subnet, subnet_interfaces = index.addresses.lookup(parsed)
+    if not interfaces and subnet is None:
+        raise HTTPException(status_code=404, detail=f"No known interface or subnet contains {address}")
+    return {
+        "address": str(parsed),
+        "interfaces": interfaces,
+        "subnet": subnet,
+        "subnet_interfaces": subnet_interfaces
+    }
+
+@app.post("/api/sites/{site_name}/regenerate", status_code=202)
+async def regenerate_site(site_name: str) -> JSONResponse:
+    """Rebuild a multi-file site's D2 files from its configs/ folder in the background"""
+    if await site_index.get_site(site_name, with_body=False) is None:
+        raise HTTPException(status_code=404, detail=f"Site '{site_name}' not found")
+    
+    site_dir = site_index.sources[site_name]["site_dir"]
+    config_dir = site_dir / "configs" if site_dir is not None else None
+    if config_dir is None or not await asyncio.to_thread(config_dir.is_dir):
+        raise HTTPException(status_code=409, detail=f"Site '{site_name}' has no configs directory to regenerate from")
+    
+    # A site that is already being regenerated returns its existing job
+    job, _ = regeneration_jobs.submit(site_name, config_dir, site_dir)
+    return JSONResponse(status_code=202, content=job, headers={"Location": f"/api/jobs/{job['id']}"})
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str) -> Dict:
+    """Status and timings of a regeneration job"""
+    job = regeneration_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
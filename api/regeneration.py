@@ -0,0 +1,130 @@
+"""
+Site regeneration jobs
+Runs the config parser and D2 generator for one site on a worker pool, so a
+site's D2 files can be rebuilt from its configs without blocking the event loop
+"""
+
+import asyncio
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Executor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# scripts/script_loader.py imports config-parser.py despite its file name
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.append(str(SCRIPTS_DIR))
+from script_loader import load_script
+
+# Finished jobs kept for GET /api/jobs/{id}; the oldest are forgotten first
+JOB_HISTORY = 256
+
+def regenerate_site(config_dir: Path, site_dir: Path, parse_jobs: int = 1) -> int:
+    """Parse a site's configs and rewrite its D2 files (blocking), returning the device count"""
+    config_parser = load_script("config_parser", "config-parser.py")
+    site_info = config_parser.read_site_header(site_dir / "main.d2", {
+        "name": site_dir.name,
+        "location": "Unknown",
+        "description": "Auto-generated from device configurations"
+    })
+    devices = config_parser.generate_site(config_dir, site_dir, site_info, jobs=parse_jobs)
+    if not devices:
+        raise ValueError(f"No devices found or parsed successfully in {config_dir}")
+    return len(devices)
+
+class RegenerationJobs:
+    """Regeneration jobs by id, with at most one queued or running job per site.
+
+    While a job runs its site directory is held in the site index, so watcher
+    events for half-written files are ignored; when the job finishes the site
+    is reread once and swapped into the index in a single step.
+    """
+
+    def __init__(self, executor: Executor, index, parse_jobs: int = 1):
+        self.executor = executor
+        self.index = index
+        self.parse_jobs = parse_jobs
+        self.jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self.active: Dict[str, str] = {}  # site key -> id of its queued or running job
+        self._tasks = set()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.jobs.get(job_id)
+
+    def submit(self, site_key: str, config_dir: Path, site_dir: Path) -> Tuple[Dict, bool]:
+        """Start regenerating a site, or return the job already doing it (job, created)"""
+        job_id = self.active.get(site_key)
+        if job_id is not None:
+            return self.jobs[job_id], False
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "site": site_key,
+            "status": "queued",
+            "created": datetime.now().isoformat(),
+            "started": None,
+            "finished": None,
+            "devices": None,
+            "timings": {},
+            "error": None
+        }
+        self.jobs[job["id"]] = job
+        self.active[site_key] = job["id"]
+        self._trim()
+
+        task = asyncio.create_task(self._run(job, config_dir, site_dir))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job, True
+
+    async def _run(self, job: Dict, config_dir: Path, site_dir: Path) -> None:
+        loop = asyncio.get_running_loop()
+        timings = job["timings"]
+        submitted = time.perf_counter()
+
+        def work() -> int:
+            started = time.perf_counter()
+            loop.call_soon_threadsafe(self._mark_running, job, started - submitted)
+            device_count = regenerate_site(config_dir, site_dir, self.parse_jobs)
+            timings["generate_seconds"] = time.perf_counter() - started
+            return device_count
+
+        self.index.hold(site_dir)
+        try:
+            try:
+                job["devices"] = await loop.run_in_executor(self.executor, work)
+            finally:
+                # Even after a failure, reindex the site once with whatever was written
+                self.index.release(site_dir)
+                indexed = time.perf_counter()
+                await self.index.update_paths([site_dir])
+                timings["index_seconds"] = time.perf_counter() - indexed
+            job["status"] = "succeeded"
+            print(f"🛠️ Regenerated {job['site']}: {job['devices']} devices")
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = f"{type(e).__name__}: {e}"
+            print(f"❌ Regenerating {job['site']} failed: {job['error']}")
+        finally:
+            self.active.pop(job["site"], None)
+            job["finished"] = datetime.now().isoformat()
+            timings["total_seconds"] = time.perf_counter() - submitted
+
+    @staticmethod
+    def _mark_running(job: Dict, queued_seconds: float) -> None:
+        job["status"] = "running"
+        job["started"] = datetime.now().isoformat()
+        job["timings"]["queued_seconds"] = queued_seconds
+
+    def _trim(self) -> None:
+        """Forget the oldest finished jobs beyond JOB_HISTORY"""
+        active_ids = set(self.active.values())
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= JOB_HISTORY:
+                break
+            if job_id not in active_ids:
+                del self.jobs[job_id]
@@ -0,0 +1,129 @@
+"""
+Serialized response cache
+Keeps encoded JSON bodies, plus gzip and brotli variants, so repeated
+requests for unchanged topology data skip serialization and compression
+"""
+
+import asyncio
+import gzip
+import json
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def dumps_json(content) -> bytes:
+    """Serialize content to compact UTF-8 JSON, using orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def supported_encodings() -> list:
+    """Content codings this server can produce, most preferred first"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Pick the best supported Content-Encoding from an Accept-Encoding header"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    for coding in supported_encodings():
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return "identity"
+
+class EncodedBody:
+    """A serialized JSON body whose compressed variants are built once, on first use"""
+
+    def __init__(self, identity: bytes):
+        self.variants: Dict[str, bytes] = {"identity": identity}
+        self.size = len(identity)
+        self.on_grow: Optional[Callable[[int], None]] = None  # set by the cache holding this body
+
+    async def get(self, encoding: str) -> bytes:
+        """Return the body in the requested coding, compressing off the event loop"""
+        if encoding not in self.variants:
+            identity = self.variants["identity"]
+            if encoding == "br":
+                compressed = await asyncio.to_thread(brotli.compress, identity, quality=BROTLI_QUALITY)
+            else:
+                compressed = await asyncio.to_thread(gzip.compress, identity, GZIP_LEVEL)
+            # A concurrent request may have stored the same coding meanwhile
+            if encoding not in self.variants:
+                self.variants[encoding] = compressed
+                self.size += len(compressed)
+                if self.on_grow is not None:
+                    self.on_grow(len(compressed))
+        return self.variants[encoding]
+
+class ResponseCache:
+    """Least-recently-used cache of encoded bodies, bounded by total size.
+
+    The total is kept as a running count, updated as bodies are added,
+    evicted or gain a compressed variant, so a hit costs no more than the
+    dict lookup.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Hashable, EncodedBody]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[EncodedBody]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: Hashable, body: EncodedBody) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._forget(previous)
+        self._entries[key] = body
+        body.on_grow = self._grow
+        self.size += body.size
+        if self.size > self.max_bytes:
+            self.trim()
+
+    def _grow(self, added: int) -> None:
+        self.size += added
+        if self.size > self.max_bytes:
+            self.trim()
+
+    def _forget(self, body: EncodedBody) -> None:
+        body.on_grow = None
+        self.size -= body.size
+
+    def trim(self) -> None:
+        """Evict the oldest bodies until the cache fits its byte budget"""
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._forget(evicted)
+
+    def clear(self) -> None:
+        for body in self._entries.values():
+            body.on_grow = None
+        self._entries.clear()
+        self.size = 0
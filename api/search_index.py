@@ -0,0 +1,217 @@
+"""
+Search index
+Inverted index over device names, roles, models, interface names and
+descriptions, plus a longest-prefix-match table of interface addresses, both
+built from parsed site graphs and updated one site at a time
+"""
+
+import bisect
+import fnmatch
+import ipaddress
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# Device and interface fields that are searchable as text
+DEVICE_FIELDS = ("role", "model", "mgmt_ip")
+INTERFACE_FIELDS = ("description", "ip_address")
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPInterface = Union[ipaddress.IPv4Interface, ipaddress.IPv6Interface]
+
+TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+
+def tokenize(value: str) -> Set[str]:
+    """The whole lowercased value plus its alphanumeric words"""
+    value = value.strip().lower()
+    if not value:
+        return set()
+    tokens = {value}
+    tokens.update(word for word in TOKEN_SPLIT.split(value) if word)
+    return tokens
+
+def parse_interface_address(config: Dict) -> Optional[IPInterface]:
+    """The interface's network (address plus mask), or None for unnumbered/DHCP interfaces"""
+    address = config.get("ip_address", "")
+    if not address or address == "dhcp":
+        return None
+    mask = config.get("subnet_mask", "")
+    try:
+        return ipaddress.ip_interface(f"{address}/{mask}" if mask else address)
+    except ValueError:
+        return None
+
+class AddressTable:
+    """Interface addresses by host and by subnet, with longest-prefix lookup.
+
+    Subnets are kept in one hash table per (IP version, prefix length); a
+    lookup masks the address once per prefix length in use, longest first.
+    That is the lookup a radix trie performs, without a node per bit.
+    """
+
+    def __init__(self):
+        self.hosts: Dict[Tuple[int, int], List[Dict]] = {}
+        self.networks: Dict[Tuple[int, int], Dict[int, List[Dict]]] = {}  # (version, prefixlen) -> network -> owners
+        self._lengths: Dict[int, List[int]] = {}  # version -> prefix lengths in use, longest first
+
+    def add(self, interface: IPInterface, owner: Dict) -> None:
+        version = interface.version
+        self.hosts.setdefault((version, int(interface.ip)), []).append(owner)
+        network = interface.network
+        table = self.networks.get((version, network.prefixlen))
+        if table is None:
+            table = self.networks[(version, network.prefixlen)] = {}
+            self._lengths[version] = sorted(
+                (length for v, length in self.networks if v == version), reverse=True
+            )
+        table.setdefault(int(network.network_address), []).append(owner)
+
+    def remove(self, interface: IPInterface, owner: Dict) -> None:
+        version = interface.version
+        self._discard(self.hosts, (version, int(interface.ip)), owner)
+        network = interface.network
+        table = self.networks.get((version, network.prefixlen))
+        if table is not None:
+            self._discard(table, int(network.network_address), owner)
+            if not table:
+                del self.networks[(version, network.prefixlen)]
+                self._lengths[version].remove(network.prefixlen)
+
+    @staticmethod
+    def _discard(table: Dict, key, owner: Dict) -> None:
+        owners = table.get(key)
+        if owners is not None:
+            owners.remove(owner)
+            if not owners:
+                del table[key]
+
+    def lookup(self, address: IPAddress) -> Tuple[List[Dict], Optional[str], List[Dict]]:
+        """(interfaces owning the address, longest matching subnet, interfaces on that subnet)"""
+        value = int(address)
+        hosts = list(self.hosts.get((address.version, value), []))
+        bits = address.max_prefixlen
+        for length in self._lengths.get(address.version, []):
+            network = value >> (bits - length) << (bits - length)
+            owners = self.networks[(address.version, length)].get(network)
+            if owners:
+                subnet = ipaddress.ip_network((network, length))
+                return hosts, str(subnet), list(owners)
+        return hosts, None, []
+
+class SearchIndex:
+    """Token postings and addresses for every indexed site.
+
+    Each site's entries are remembered so a changed site can be dropped and
+    reindexed on its own. Prefix queries (rlab*) bisect a sorted token list
+    that is rebuilt lazily after updates.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Set[int]] = {}
+        self.entries: Dict[int, Dict] = {}
+        self.addresses = AddressTable()
+        self._site_entries: Dict[str, List[Tuple[int, Set[str]]]] = {}
+        self._site_addresses: Dict[str, List[Tuple[IPInterface, Dict]]] = {}
+        self._next_id = 0
+        self._sorted_tokens: Optional[List[str]] = None
+
+    def __contains__(self, site_key: str) -> bool:
+        return site_key in self._site_entries
+
+    def update_site(self, site_key: str, graph: Dict) -> None:
+        """Replace a site's entries with those of its freshly parsed graph"""
+        self.remove_site(site_key)
+        entries = self._site_entries[site_key] = []
+        addresses = self._site_addresses[site_key] = []
+
+        def add(entry: Dict, tokens: Set[str]) -> None:
+            entry_id = self._next_id
+            self._next_id += 1
+            self.entries[entry_id] = entry
+            for token in tokens:
+                self.postings.setdefault(token, set()).add(entry_id)
+            entries.append((entry_id, tokens))
+
+        for node in graph["nodes"]:
+            device = node["id"]
+            add({"site": site_key, "device": device, "field": "name", "value": device},
+                tokenize(device) | tokenize(node.get("label", "")))
+            add({"site": site_key, "device": device, "field": "type", "value": node.get("type", "")},
+                tokenize(node.get("type", "")))
+            for field in DEVICE_FIELDS:
+                value = node["device"].get(field, "")
+                if value:
+                    add({"site": site_key, "device": device, "field": field, "value": value}, tokenize(value))
+            for svi_name, svi in node["device"].get("svis", {}).items():
+                self._add_interface(site_key, device, svi_name, svi, add, addresses)
+
+        for interface in graph["interfaces"].values():
+            self._add_interface(site_key, interface["device"], interface["interface"],
+                                interface["config"], add, addresses)
+        self._sorted_tokens = None
+
+    def _add_interface(self, site_key: str, device: str, name: str, config: Dict,
+                       add, addresses: List) -> None:
+        owner = {"site": site_key, "device": device, "interface": name}
+        add({**owner, "field": "interface", "value": name}, tokenize(name))
+        for field in INTERFACE_FIELDS:
+            value = config.get(field, "")
+            if value:
+                add({**owner, "field": field, "value": value}, tokenize(value))
+
+        interface = parse_interface_address(config)
+        if interface is not None:
+            address_owner = {**owner, "address": str(interface)}
+            self.addresses.add(interface, address_owner)
+            addresses.append((interface, address_owner))
+
+    def remove_site(self, site_key: str) -> None:
+        for entry_id, tokens in self._site_entries.pop(site_key, []):
+            del self.entries[entry_id]
+            for token in tokens:
+                posting = self.postings.get(token)
+                if posting is not None:
+                    posting.discard(entry_id)
+                    if not posting:
+                        del self.postings[token]
+                        self._sorted_tokens = None
+        for interface, owner in self._site_addresses.pop(site_key, []):
+            self.addresses.remove(interface, owner)
+
+    def _matching_tokens(self, term: str) -> Iterable[str]:
+        """Tokens matched by one query term: exact, prefix (abc*) or glob (a*c)"""
+        if "*" not in term and "?" not in term:
+            return [term] if term in self.postings else []
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.postings)
+        prefix = term.rstrip("*")
+        if "*" not in prefix and "?" not in prefix:
+            start = bisect.bisect_left(self._sorted_tokens, prefix)
+            end = bisect.bisect_left(self._sorted_tokens, prefix + "\uffff")
+            return self._sorted_tokens[start:end]
+        return fnmatch.filter(self._sorted_tokens, term)
+
+    def search(self, query: str, limit: int = 100) -> Tuple[int, List[Dict]]:
+        """Entries matching a query (total, first limit).
+
+        Every whitespace-separated term must match the same device, though
+        not necessarily the same field: "access_switch s0002*" finds access
+        switches whose names start with s0002.
+        """
+        matched_ids: Set[int] = set()
+        devices: Optional[Set[Tuple[str, str]]] = None
+        for term in query.lower().split():
+            ids: Set[int] = set()
+            for token in self._matching_tokens(term):
+                ids |= self.postings[token]
+            term_devices = {(self.entries[entry_id]["site"], self.entries[entry_id]["device"]) for entry_id in ids}
+            devices = term_devices if devices is None else devices & term_devices
+            if not devices:
+                return 0, []
+            matched_ids |= ids
+        if devices is None:
+            return 0, []
+        ordered = sorted(
+            entry_id for entry_id in matched_ids
+            if (self.entries[entry_id]["site"], self.entries[entry_id]["device"]) in devices
+        )
+        return len(ordered), [self.entries[entry_id] for entry_id in ordered[:limit]]
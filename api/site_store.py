@@ -0,0 +1,90 @@
+"""
+Persistent site metadata index
+Keeps extracted site metadata and file signatures in SQLite so that after a
+restart only the sites whose files changed have to be reread
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable
+
+# Bump when the stored row format changes; older databases are rebuilt
+SCHEMA_VERSION = 2
+
+class SiteMetadataStore:
+    """SQLite-backed store of per-site metadata and file signatures.
+
+    Every method is blocking and opens its own connection, so callers on the
+    event loop should run them in a worker thread.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, (re)creating the schema when needed"""
+        conn = sqlite3.connect(self.db_path)
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS sites")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sites (
+                site_key TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                site_info TEXT NOT NULL,
+                file_path TEXT NOT NULL
+            )
+        """)
+        return conn
+
+    def load(self) -> Dict[str, Dict]:
+        """Load every stored site, keyed by site key"""
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT site_key, signature, site_info, file_path FROM sites"
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not load site index from {self.db_path}: {e}")
+            return {}
+
+        return {
+            site_key: {
+                # Signatures are stored as [path, mtime_ns, size] lists
+                "signature": tuple(tuple(entry) for entry in json.loads(signature)),
+                "site_info": json.loads(site_info),
+                "file_path": file_path
+            }
+            for site_key, signature, site_info, file_path in rows
+        }
+
+    def save(self, updated: Dict[str, Dict], removed: Iterable[str] = ()) -> None:
+        """Upsert changed sites and delete removed ones in a single transaction"""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO sites VALUES (?, ?, ?, ?)",
+                        [
+                            (
+                                site_key,
+                                json.dumps(row["signature"]),
+                                json.dumps(row["site_info"]),
+                                row["file_path"]
+                            )
+                            for site_key, row in updated.items()
+                        ]
+                    )
+                    conn.executemany(
+                        "DELETE FROM sites WHERE site_key = ?",
+                        [(site_key,) for site_key in removed]
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not update site index at {self.db_path}: {e}")
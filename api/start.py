@@ -12,7 +12,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
     print("🚀 Starting Network Topology API...")
-    print("📁 Serving D2 files from: ../sites/")
+    print("📁 Serving D2 files from: ../sites/ (watched for changes)")
     print("🌐 Frontend available at: http://localhost:8000/")
     print("📊 API docs available at: http://localhost:8000/docs")
     print("💡 Health check: http://localhost:8000/api/health")
@@ -23,6 +23,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        reload_dirs=["../sites", "."],
+        # Only reload on code changes; the site index watches ../sites itself
+        reload_dirs=["."],
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Site topology
+Adjacency lists built from a parsed site graph's links, with shortest-path
+and failure-impact queries that answer from precomputed DFS tables
+"""
+
+from typing import Dict, List, Optional
+
+class SiteTopology:
+    """A site's devices and links as an undirected multigraph.
+
+    Built once per parsed graph. A single iterative DFS records each device's
+    discovery index, lowest reachable index (Tarjan's low-link) and subtree
+    size, and lists devices in discovery order, so every DFS subtree is one
+    contiguous slice of that list. Articulation points, bridges and the
+    devices cut off by a failure are then read off without another traversal.
+    """
+
+    def __init__(self, graph: Dict):
+        self.devices: List[str] = [node["id"] for node in graph["nodes"]]
+        self.index: Dict[str, int] = {device: i for i, device in enumerate(self.devices)}
+        self.links: List[Dict] = []
+        self.adjacency: List[List[tuple]] = [[] for _ in self.devices]  # device -> [(neighbour, link id)]
+
+        for link in graph["links"]:
+            source = self._device_index(link["source"])
+            target = self._device_index(link["target"])
+            if source == target:
+                continue
+            link_id = len(self.links)
+            self.links.append(link)
+            self.adjacency[source].append((target, link_id))
+            self.adjacency[target].append((source, link_id))
+
+        self._build_dfs_tables()
+
+    def _device_index(self, device: str) -> int:
+        """Index of a device, adding link endpoints that have no definition"""
+        i = self.index.get(device)
+        if i is None:
+            i = self.index[device] = len(self.devices)
+            self.devices.append(device)
+            self.adjacency.append([])
+        return i
+
+    def _build_dfs_tables(self) -> None:
+        count = len(self.devices)
+        self.order: List[int] = []  # devices in discovery order
+        self.discovered = [-1] * count
+        self.low = [0] * count
+        self.size = [1] * count
+        self.parent = [-1] * count
+        self.parent_link = [-1] * count
+        self.component = [-1] * count
+        self.component_sizes: List[int] = []
+
+        for root in range(count):
+            if self.discovered[root] != -1:
+                continue
+            component = len(self.component_sizes)
+            self._discover(root, component)
+            # (device, position in its adjacency list)
+            stack = [(root, 0)]
+            while stack:
+                device, position = stack[-1]
+                neighbours = self.adjacency[device]
+                if position < len(neighbours):
+                    stack[-1] = (device, position + 1)
+                    neighbour, link_id = neighbours[position]
+                    if self.discovered[neighbour] == -1:
+                        self.parent[neighbour] = device
+                        self.parent_link[neighbour] = link_id
+                        self._discover(neighbour, component)
+                        stack.append((neighbour, 0))
+                    elif link_id != self.parent_link[device]:
+                        self.low[device] = min(self.low[device], self.discovered[neighbour])
+                    continue
+
+                stack.pop()
+                parent = self.parent[device]
+                if parent != -1:
+                    self.low[parent] = min(self.low[parent], self.low[device])
+                    self.size[parent] += self.size[device]
+            self.component_sizes.append(self.size[root])
+
+    def _discover(self, device: int, component: int) -> None:
+        self.discovered[device] = self.low[device] = len(self.order)
+        self.component[device] = component
+        self.order.append(device)
+
+    def _subtree(self, device: int) -> List[str]:
+        start = self.discovered[device]
+        return [self.devices[i] for i in self.order[start:start + self.size[device]]]
+
+    def _outside_subtrees(self, device: int, roots: List[int]) -> List[int]:
+        """Devices of device's component outside the DFS subtrees of roots"""
+        excluded = set()
+        for root in roots:
+            start = self.discovered[root]
+            excluded.update(self.order[start:start + self.size[root]])
+        return [i for i in self.order
+                if self.component[i] == self.component[device] and i not in excluded]
+
+    def _is_tree_child(self, child: int, link_id: int) -> bool:
+        return self.parent_link[child] == link_id
+
+    def _link_hop(self, link_id: int, device: int) -> Dict:
+        """A link as seen leaving device: local and remote interface names"""
+        link = self.links[link_id]
+        if self.index[link["source"]] == device:
+            return {"interface": link["sourceInterface"], "neighbor": link["target"],
+                    "neighbor_interface": link["targetInterface"]}
+        return {"interface": link["targetInterface"], "neighbor": link["source"],
+                "neighbor_interface": link["sourceInterface"]}
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[Dict]]:
+        """Fewest-hop path as one entry per hop (device, egress and ingress interface), or None"""
+        start, goal = self.index[source], self.index[target]
+        if start == goal:
+            return []
+        if self.component[start] != self.component[goal]:
+            return None
+
+        # Breadth-first from both ends, always growing the smaller frontier
+        previous: Dict[int, tuple] = {start: (-1, -1)}
+        following: Dict[int, tuple] = {goal: (-1, -1)}
+        forward, backward = [start], [goal]
+        meeting = -1
+        while meeting == -1:
+            if len(forward) <= len(backward):
+                forward, meeting = self._expand(forward, previous, following)
+            else:
+                backward, meeting = self._expand(backward, following, previous)
+
+        links = []
+        device = meeting
+        while previous[device][0] != -1:
+            device, link_id = previous[device]
+            links.append((device, link_id))
+        links.reverse()
+        device = meeting
+        while following[device][0] != -1:
+            next_device, link_id = following[device]
+            links.append((device, link_id))
+            device = next_device
+
+        return [{"device": self.devices[device], **self._link_hop(link_id, device)}
+                for device, link_id in links]
+
+    def _expand(self, frontier: List[int], seen: Dict[int, tuple], other: Dict[int, tuple]):
+        """One BFS level: (next frontier, device where the searches meet or -1)"""
+        next_frontier = []
+        for device in frontier:
+            for neighbour, link_id in self.adjacency[device]:
+                if neighbour in seen:
+                    continue
+                seen[neighbour] = (device, link_id)
+                if neighbour in other:
+                    return next_frontier, neighbour
+                next_frontier.append(neighbour)
+        return next_frontier, -1
+
+    def device_impact(self, device: str) -> Dict:
+        """What a device's failure partitions, and what each of its links' failures cuts off"""
+        u = self.index[device]
+        discovered = self.discovered[u]
+        component_size = self.component_sizes[self.component[u]]
+
+        # A DFS child whose subtree cannot reach above u is cut off when u fails
+        cut = [
+            neighbour for neighbour, link_id in self.adjacency[u]
+            if self._is_tree_child(neighbour, link_id) and self.low[neighbour] >= discovered
+        ]
+        partitions = [self._subtree(child) for child in cut]
+        if self.parent[u] == -1 and len(partitions) == 1:
+            partitions = []  # A root with one DFS child leaves the rest connected
+        elif self.parent[u] != -1 and partitions:
+            # Everything else stays together with u's DFS ancestors
+            partitions.append([self.devices[i] for i in self._outside_subtrees(u, cut) if i != u])
+        partitions.sort(key=len, reverse=True)
+
+        links = []
+        for neighbour, link_id in self.adjacency[u]:
+            hop = self._link_hop(link_id, u)
+            if self._is_tree_child(neighbour, link_id) and self.low[neighbour] > discovered:
+                isolated = self._subtree(neighbour)
+            elif self._is_tree_child(u, link_id) and self.low[u] > self.discovered[neighbour]:
+                isolated = [self.devices[i] for i in self._outside_subtrees(u, [u])]
+            else:
+                isolated = []
+            links.append({**hop, "bridge": bool(isolated), "isolated": isolated})
+
+        return {
+            "device": device,
+            "articulation_point": len(partitions) > 1,
+            "component_size": component_size,
+            "partitions": partitions,
+            "links": links
+        }
+
+    def summary(self) -> Dict:
+        """Device, link and component counts with every articulation point and bridge"""
+        articulation_points = []
+        bridges = []
+        for u in range(len(self.devices)):
+            children = [
+                neighbour for neighbour, link_id in self.adjacency[u]
+                if self._is_tree_child(neighbour, link_id)
+            ]
+            if self.parent[u] == -1:
+                if len(children) > 1:
+                    articulation_points.append(self.devices[u])
+            elif any(self.low[child] >= self.discovered[u] for child in children):
+                articulation_points.append(self.devices[u])
+            for child in children:
+                if self.low[child] > self.discovered[u]:
+                    bridges.append(self.links[self.parent_link[child]])
+        return {
+            "devices": len(self.devices),
+            "links": len(self.links),
+            "components": len(self.component_sizes),
+            "articulation_points": articulation_points,
+            "bridges": bridges
+        }
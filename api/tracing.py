@@ -0,0 +1,181 @@
+"""
+Request tracing
+Times the phases of each API request (directory walking, file reads, metadata
+extraction, multi-file combination, JSON encoding) for a Server-Timing header,
+and records the full span tree when a request asks for ?trace=1
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+class Span:
+    """One timed operation and the operations started inside it"""
+
+    __slots__ = ("name", "detail", "started", "duration", "children")
+
+    def __init__(self, name: str, detail: Optional[str], started: float):
+        self.name = name
+        self.detail = detail
+        self.started = started
+        self.duration: Optional[float] = None
+        self.children: List["Span"] = []
+
+    def to_dict(self, origin: float) -> Dict:
+        span = {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None
+        }
+        if self.detail is not None:
+            span["detail"] = self.detail
+        if self.children:
+            span["children"] = [child.to_dict(origin) for child in self.children]
+        return span
+
+class Trace:
+    """Per-request phase totals, plus a span tree when detailed"""
+
+    def __init__(self, detailed: bool = False):
+        self.detailed = detailed
+        self.started = time.perf_counter()
+        self.phases: Dict[str, List] = {}  # phase -> [seconds, spans]
+        self.root = Span("request", None, self.started)
+
+    def record(self, name: str, elapsed: float) -> None:
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0.0, 0]
+        phase[0] += elapsed
+        phase[1] += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: each phase's summed duration, then the total.
+
+        Phases run concurrently (many files are read at once), so their sums
+        can exceed the total, and nested phases (reads inside combine) overlap.
+        """
+        entries = [
+            f'{name};dur={seconds * 1000:.2f};desc="{count}x"'
+            for name, (seconds, count) in self.phases.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict:
+        self.root.duration = time.perf_counter() - self.started
+        return {
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "phases": {
+                name: {"duration_ms": round(seconds * 1000, 3), "count": count}
+                for name, (seconds, count) in self.phases.items()
+            },
+            "spans": self.root.to_dict(self.started)
+        }
+
+# The trace of the request being handled, and the innermost open span in a detailed trace
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+@contextmanager
+def span(name: str, detail: Optional[str] = None):
+    """Time the block as a phase of the current request (a no-op outside requests)"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    if not trace.detailed:
+        try:
+            yield
+        finally:
+            trace.record(name, time.perf_counter() - started)
+        return
+
+    # Tasks and threads started inside the block inherit this span as their parent
+    node = Span(name, detail, started)
+    (current_span.get() or trace.root).children.append(node)
+    token = current_span.set(node)
+    try:
+        yield
+    finally:
+        node.duration = time.perf_counter() - started
+        current_span.reset(token)
+        trace.record(name, node.duration)
+
+class TracingMiddleware:
+    """ASGI middleware adding Server-Timing to every response.
+
+    With ?trace=1 the response body is replaced by the request's span tree
+    (JSON), keeping the original status code unless it forbids a body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        trace = Trace(detailed=query.get("trace", [""])[-1] in ("1", "true"))
+        token = current_trace.set(trace)
+        try:
+            if trace.detailed:
+                await self._send_trace(trace, scope, receive, send)
+            else:
+                await self.app(scope, receive, self._with_server_timing(trace, send))
+        finally:
+            current_trace.reset(token)
+
+    @staticmethod
+    def _with_server_timing(trace: Trace, send):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+        return send_wrapper
+
+    async def _send_trace(self, trace: Trace, scope, receive, send):
+        status = [500]
+        body_bytes = [0]
+        cors_headers = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                cors_headers.extend(
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower().startswith(b"access-control-")
+                )
+            elif message["type"] == "http.response.body":
+                body_bytes[0] += len(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        report = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status[0],
+            "response_bytes": body_bytes[0],
+            **trace.to_dict()
+        }
+        body = json.dumps(report).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            # 204 and 304 responses cannot carry the report
+            "status": 200 if status[0] in (204, 304) else status[0],
+            "headers": cors_headers + [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"server-timing", trace.server_timing().encode("latin-1")),
+                (b"cache-control", b"no-store")
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
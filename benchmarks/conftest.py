@@ -0,0 +1,81 @@
+"""
+Shared fixtures for the benchmark suite
+Builds a synthetic estate with scripts/generate-sites.py at the scale named by
+BENCH_SCALE (small, medium or large; default small), or reuses a tree already
+rendered into BENCH_DATA_DIR
+"""
+
+import contextlib
+import io
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+API_DIR = PROJECT_ROOT / "api"
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+from script_loader import load_script
+
+@dataclass
+class Estate:
+    """A generated region/site tree and what was generated into it"""
+    root: Path
+    config_dirs: List[Path]
+    devices: int
+
+@pytest.fixture(scope="session")
+def config_parser():
+    return load_script("config_parser", "config-parser.py")
+
+@pytest.fixture(scope="session")
+def estate(tmp_path_factory, config_parser) -> Estate:
+    data_dir = os.environ.get("BENCH_DATA_DIR")
+    if data_dir and any(Path(data_dir).iterdir()):
+        root = Path(data_dir)
+    else:
+        generator = load_script("generate_sites", "generate-sites.py")
+        scale = generator.PRESETS[os.environ.get("BENCH_SCALE", "small")]
+        root = Path(data_dir) if data_dir else tmp_path_factory.mktemp("estate")
+        generator.generate_sites(root, scale["devices"], scale["sites"])
+
+        # Render D2 so the API benchmarks have sites to serve
+        sites = config_parser.load_batch_sites(root, {"location": "Synthetic", "description": "Benchmark"})
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert config_parser.run_batch(sites, jobs=1, force=False)
+
+    config_dirs = sorted(path for path in root.rglob("configs") if path.is_dir())
+    devices = sum(1 for config_dir in config_dirs for _ in config_dir.glob("*.conf"))
+    return Estate(root=root, config_dirs=config_dirs, devices=devices)
+
+@pytest.fixture(scope="session")
+def parsed_sites(estate, config_parser):
+    """Every site's parsed devices, for benchmarks that start after parsing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [config_parser.ConfigParser(config_dir).parse_all_configs() for config_dir in estate.config_dirs]
+
+@pytest.fixture(scope="session")
+def api_main(estate, tmp_path_factory):
+    """The API module, with its site index pointed at the generated estate"""
+    # Never the developer's exported SITE_INDEX_DB: the benchmarks must not write to a real index
+    index_db = tmp_path_factory.mktemp("index") / "site-index.sqlite3"
+    os.environ["SITE_INDEX_DB"] = str(index_db)
+    if str(API_DIR) not in sys.path:
+        sys.path.insert(0, str(API_DIR))
+    import main
+
+    main.configure_sites(estate.root, index_db)
+    return main
+
+@pytest.fixture(scope="session")
+def api_client(api_main):
+    from fastapi.testclient import TestClient
+
+    with TestClient(api_main.app) as client:
+        yield client
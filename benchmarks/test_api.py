@@ -0,0 +1,60 @@
+"""
+API benchmarks: site discovery and the site handlers through the ASGI test client
+"""
+
+import asyncio
+
+def test_scan_sites_recursive(benchmark, estate, api_main, api_client):
+    sites = benchmark(lambda: asyncio.run(api_main.scan_sites_recursive(estate.root)))
+    assert len(sites) == len(estate.config_dirs)
+
+def test_api_sites(benchmark, api_client):
+    """Full listing with a warm response cache"""
+    response = benchmark(api_client.get, "/api/sites")
+    assert response.status_code == 200
+
+def test_api_sites_uncached(benchmark, api_client, api_main):
+    """Full listing rebuilt and serialized on every request"""
+    def clear_cache():
+        api_main.response_cache.clear()
+
+    response = benchmark.pedantic(api_client.get, args=("/api/sites",), setup=clear_cache, rounds=20)
+    assert response.status_code == 200
+
+def test_api_sites_summary(benchmark, api_client):
+    response = benchmark(api_client.get, "/api/sites?fields=summary")
+    assert response.status_code == 200
+
+def test_api_site(benchmark, api_client, api_main):
+    site_key = next(iter(api_main.site_index.sites))
+    response = benchmark(api_client.get, f"/api/sites/{site_key}")
+    assert response.status_code == 200
+
+def test_api_site_uncached(benchmark, api_client, api_main):
+    site_key = next(iter(api_main.site_index.sites))
+
+    def clear_cache():
+        api_main.response_cache.clear()
+
+    response = benchmark.pedantic(api_client.get, args=(f"/api/sites/{site_key}",), setup=clear_cache, rounds=20)
+    assert response.status_code == 200
+
+def test_api_search(benchmark, api_client):
+    """Prefix search with the index already built"""
+    api_client.get("/api/search?q=r*")
+    response = benchmark(api_client.get, "/api/search?q=r*&limit=10")
+    assert response.status_code == 200
+
+def test_api_site_path(benchmark, api_client, api_main):
+    """Shortest path across a site with its topology already built"""
+    site_key = next(iter(api_main.site_index.sites))
+    devices = [node["id"] for node in api_client.get(f"/api/sites/{site_key}/graph").json()["nodes"]]
+    params = {"from": devices[0], "to": devices[-1]}
+    response = benchmark(api_client.get, f"/api/sites/{site_key}/path", params=params)
+    assert response.json()["reachable"]
+
+def test_api_site_impact(benchmark, api_client, api_main):
+    site_key = next(iter(api_main.site_index.sites))
+    devices = [node["id"] for node in api_client.get(f"/api/sites/{site_key}/graph").json()["nodes"]]
+    response = benchmark(api_client.get, f"/api/sites/{site_key}/impact", params={"device": devices[0]})
+    assert response.status_code == 200
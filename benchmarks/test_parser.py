@@ -0,0 +1,56 @@
+"""
+Config parser benchmarks: parsing, link detection and D2 rendering
+"""
+
+import contextlib
+import io
+import itertools
+
+def test_parse_all_configs(benchmark, estate, config_parser):
+    def parse_estate():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [config_parser.ConfigParser(config_dir).parse_all_configs()
+                    for config_dir in estate.config_dirs]
+
+    sites = benchmark(parse_estate)
+    assert sum(len(devices) for devices in sites) == estate.devices
+
+def test_detect_connections(benchmark, parsed_sites, config_parser):
+    def detect():
+        return [config_parser.D2Generator(devices)._detect_connections() for devices in parsed_sites]
+
+    connections = benchmark(detect)
+    assert any(connections)
+
+def test_generate_d2_files(benchmark, parsed_sites, config_parser, tmp_path):
+    """Full render into empty output directories (every file is written)"""
+    run = itertools.count()
+
+    def fresh_output_dirs():
+        round_dir = tmp_path / f"round-{next(run)}"
+        output_dirs = [round_dir / f"site-{index}" for index in range(len(parsed_sites))]
+        for output_dir in output_dirs:
+            output_dir.mkdir(parents=True)
+        return (output_dirs,), {}
+
+    def render(output_dirs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for devices, output_dir in zip(parsed_sites, output_dirs):
+                config_parser.D2Generator(devices).generate_d2_files(output_dir)
+
+    benchmark.pedantic(render, setup=fresh_output_dirs, rounds=5)
+
+def test_generate_d2_files_unchanged(benchmark, parsed_sites, config_parser, tmp_path):
+    """Re-render over identical output (nothing should be rewritten)"""
+    output_dirs = [tmp_path / f"site-{index}" for index in range(len(parsed_sites))]
+
+    def render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for devices, output_dir in zip(parsed_sites, output_dirs):
+                output_dir.mkdir(exist_ok=True)
+                config_parser.D2Generator(devices).generate_d2_files(output_dir)
+
+    render()
+    mtimes = {path: path.stat().st_mtime_ns for path in tmp_path.rglob("*.d2")}
+    benchmark(render)
+    assert mtimes == {path: path.stat().st_mtime_ns for path in tmp_path.rglob("*.d2")}
@@ -4,40 +4,450 @@ GNS3 Config to D2 Parser
 Parses Cisco device configuration files and generates D2 topology files
 """
 
+import io
 import os
 import re
+import json
+import time
+import hashlib
 import ipaddress
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from sys import intern
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
 
+# Parsed records are slotted dataclasses: large sites hold tens of thousands of
+# interfaces, and these records are what worker processes pickle back. Values
+# drawn from a small vocabulary (status, masks, areas, ASNs) are interned so
+# every record shares one copy of each string.
+
+@dataclass(slots=True)
+class InterfaceConfig:
+    """A parsed interface (physical, LAG, SVI or loopback)"""
+    name: str
+    status: str = 'up'
+    description: str = ''
+    ip_address: str = ''
+    subnet_mask: str = ''
+    negotiation: str = ''
+    other_config: Tuple[str, ...] = ()
+    port_channel: bool = False
+    protocol: str = ''
+    lag_member: bool = False
+    lag_id: Optional[str] = None
+    
+    def __post_init__(self):
+        self.status = intern(self.status)
+        self.subnet_mask = intern(self.subnet_mask)
+        self.negotiation = intern(self.negotiation)
+        self.protocol = intern(self.protocol)
+        self.other_config = tuple(self.other_config)
+
+@dataclass(slots=True)
+class OspfNetwork:
+    """An OSPF 'network ... area ...' statement"""
+    network: str
+    wildcard: str
+    area: str
+    
+    def __post_init__(self):
+        self.wildcard = intern(self.wildcard)
+        self.area = intern(self.area)
+
+@dataclass(slots=True)
+class OspfInterface:
+    """An interface-level OSPF assignment (Aruba 'ip ospf <pid> area <area>')"""
+    interface: str
+    process_id: str
+    area: str
+    
+    def __post_init__(self):
+        self.process_id = intern(self.process_id)
+        self.area = intern(self.area)
+
+@dataclass(slots=True)
+class OspfConfig:
+    """A parsed OSPF process"""
+    process_id: str
+    router_id: str = ''
+    networks: List[OspfNetwork] = field(default_factory=list)
+    areas: List[str] = field(default_factory=list)
+    interfaces: List[OspfInterface] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self.process_id = intern(self.process_id)
+        self.areas = [intern(area) for area in self.areas]
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'OspfConfig':
+        return cls(
+            process_id=data['process_id'],
+            router_id=data['router_id'],
+            networks=[OspfNetwork(**network) for network in data['networks']],
+            areas=data['areas'],
+            interfaces=[OspfInterface(**intf) for intf in data['interfaces']]
+        )
+
+@dataclass(slots=True)
+class BgpNeighbor:
+    """A BGP neighbor and its remote AS"""
+    ip: str
+    remote_asn: str
+    
+    def __post_init__(self):
+        self.remote_asn = intern(self.remote_asn)
+
+@dataclass(slots=True)
+class BgpConfig:
+    """A parsed BGP process"""
+    asn: str
+    neighbors: List[BgpNeighbor] = field(default_factory=list)
+    address_families: List[str] = field(default_factory=list)
+    redistribute: List[str] = field(default_factory=list)
+    
+    def __post_init__(self):
+        self.asn = intern(self.asn)
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BgpConfig':
+        return cls(
+            asn=data['asn'],
+            neighbors=[BgpNeighbor(**neighbor) for neighbor in data['neighbors']],
+            address_families=data['address_families'],
+            redistribute=data['redistribute']
+        )
+
+RoutingConfig = Union[OspfConfig, BgpConfig]
+ROUTING_CONFIG_TYPES = {'ospf': OspfConfig, 'bgp': BgpConfig}
+
+@dataclass(slots=True)
 class DeviceConfig:
     """Represents a parsed device configuration"""
-    def __init__(self, hostname: str, filename: str):
-        self.hostname = hostname
-        self.filename = filename
-        self.device_type = "router"  # Default, can be detected later
-        self.device_role = detect_device_role(hostname)  # Auto-detect role from hostname
-        self.model = ""
-        self.interfaces = {}
-        self.loopbacks = {}
-        self.routing_protocols = {}
-        self.vlans = {}
-        
-    def add_interface(self, name: str, config: Dict):
+    hostname: str
+    filename: str
+    device_type: str = "router"  # Default, can be detected later
+    device_role: str = ""  # Auto-detected from the hostname when not given
+    model: str = ""
+    interfaces: Dict[str, InterfaceConfig] = field(default_factory=dict)
+    loopbacks: Dict[str, InterfaceConfig] = field(default_factory=dict)
+    routing_protocols: Dict[str, RoutingConfig] = field(default_factory=dict)
+    vlans: Dict = field(default_factory=dict)
+    
+    def __post_init__(self):
+        if not self.device_role:
+            self.device_role = detect_device_role(self.hostname)
+        self.device_type = intern(self.device_type)
+        self.device_role = intern(self.device_role)
+        self.model = intern(self.model)
+        
+    def add_interface(self, name: str, config: InterfaceConfig):
         """Add interface configuration"""
         self.interfaces[name] = config
         
-    def add_loopback(self, name: str, config: Dict):
+    def add_loopback(self, name: str, config: InterfaceConfig):
         """Add loopback interface configuration"""
         self.loopbacks[name] = config
         
-    def add_routing_protocol(self, protocol: str, config: Dict):
+    def add_routing_protocol(self, protocol: str, config: RoutingConfig):
         """Add routing protocol configuration"""
         self.routing_protocols[protocol] = config
+        
+    def to_dict(self) -> Dict:
+        """Plain JSON-serializable form, as cached in the parse manifest"""
+        return asdict(self)
+        
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DeviceConfig':
+        """Rebuild a device from its cached form without re-parsing"""
+        return cls(
+            hostname=data['hostname'],
+            filename=data['filename'],
+            device_type=data['device_type'],
+            device_role=data['device_role'],
+            model=data['model'],
+            interfaces={name: InterfaceConfig(**intf) for name, intf in data['interfaces'].items()},
+            loopbacks={name: InterfaceConfig(**intf) for name, intf in data['loopbacks'].items()},
+            routing_protocols={
+                protocol: ROUTING_CONFIG_TYPES[protocol].from_dict(config)
+                for protocol, config in data['routing_protocols'].items()
+            },
+            vlans=data['vlans']
+        )
+
+MANIFEST_NAME = ".config-manifest.json"
+MANIFEST_VERSION = 2
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Atomically replace path with content, unless it already holds exactly those bytes"""
+    data = content.encode('utf-8')
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+        
+    # Write a sibling temp file and rename it over the target, so readers (and
+    # the API's file watcher) never see a half-written file
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return True
+
+# Buffer size for streamed D2 output
+WRITE_BUFFER = 1 << 16
+
+def stream_if_changed(path: Path, lines: Iterable[str]) -> bool:
+    """Stream newline-joined lines into path atomically, unless it already holds exactly those bytes.
+    
+    Rendered text is compared against the existing file as it arrives; the temp
+    file is only opened at the first difference, seeded with the matching prefix
+    """
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        existing = open(path, 'rb', buffering=WRITE_BUFFER)
+    except FileNotFoundError:
+        existing = None
+    out = None
+    matched = 0
+    try:
+        separator = b''
+        for line in lines:
+            chunk = separator + line.encode('utf-8')
+            separator = b'\n'
+            if out is None:
+                if existing is not None and existing.read(len(chunk)) == chunk:
+                    matched += len(chunk)
+                    continue
+                out = _open_stream_temp(temp_path, existing, matched)
+            out.write(chunk)
+        if out is None:
+            if existing is not None and not existing.read(1):
+                return False
+            # The new content is a prefix of the old file (or there is no file yet)
+            out = _open_stream_temp(temp_path, existing, matched)
+        out.close()
+        os.replace(temp_path, path)
+    except BaseException:
+        if out is not None:
+            out.close()
+        temp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        if existing is not None:
+            existing.close()
+    return True
+
+def _open_stream_temp(temp_path: Path, existing, matched: int):
+    """Open the temp file for stream_if_changed, copying the already matched prefix into it"""
+    out = open(temp_path, 'wb', buffering=WRITE_BUFFER)
+    if matched:
+        existing.seek(0)
+        while matched:
+            block = existing.read(min(matched, WRITE_BUFFER))
+            out.write(block)
+            matched -= len(block)
+    return out
+
+def file_digest(path: Path) -> Optional[str]:
+    """SHA-256 of a file's contents, or None if it cannot be read"""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
 
-def detect_device_os(config_text: str) -> str:
-    """Detect the device operating system from configuration text"""
-    if "Version AOS-CX" in config_text or "!Version AOS-CX" in config_text:
+def read_with_digest(path: Path) -> Tuple[Optional[bytes], Optional[str]]:
+    """A file's bytes and their SHA-256, or (None, None) if it cannot be read"""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None, None
+    return data, hashlib.sha256(data).hexdigest()
+
+class StageProfiler:
+    """Wall and CPU time per parser stage, in total and per device (--profile)"""
+    
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}  # stage -> [wall, cpu, calls]
+        self.devices: List[Dict] = []
+        self.site = ""  # Site being generated, recorded on each device entry
+        self._device: Optional[Dict] = None
+        
+    @contextmanager
+    def stage(self, name: str):
+        """Time one stage, counting it towards the current device if there is one"""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += 1
+            if self._device is not None:
+                device_stage = self._device['stages'].setdefault(name, [0.0, 0.0])
+                device_stage[0] += wall
+                device_stage[1] += cpu
+                
+    @contextmanager
+    def device(self, **info):
+        """Attribute the stages run inside this block to one device"""
+        record = {'site': self.site, **info, 'wall': 0.0, 'cpu': 0.0, 'stages': {}}
+        self._device = record
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - wall
+            record['cpu'] = time.process_time() - cpu
+            self._device = None
+            self.devices.append(record)
+            
+    def export(self) -> Dict:
+        """Raw timings, for shipping from a worker process to the parent"""
+        return {'stages': self.stages, 'devices': self.devices}
+        
+    def merge(self, exported: Dict):
+        """Fold in timings exported by a worker process"""
+        for name, (wall, cpu, calls) in exported['stages'].items():
+            totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += wall
+            totals[1] += cpu
+            totals[2] += calls
+        for record in exported['devices']:
+            record['site'] = self.site
+            self.devices.append(record)
+            
+    def report(self, wall: float, cpu: float) -> Dict:
+        """Summarize timings, combining each device's parse and render entries"""
+        devices: Dict[Tuple[str, str], Dict] = {}
+        for record in self.devices:
+            key = (record['site'], record.get('hostname') or record.get('file', ''))
+            merged = devices.setdefault(key, {
+                'site': record['site'], 'hostname': record.get('hostname', ''),
+                'file': '', 'wall': 0.0, 'cpu': 0.0, 'stages': {}
+            })
+            merged['file'] = merged['file'] or record.get('file', '')
+            merged['wall'] += record['wall']
+            merged['cpu'] += record['cpu']
+            for name, (stage_wall, stage_cpu) in record['stages'].items():
+                stage = merged['stages'].setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+                stage['wall'] += stage_wall
+                stage['cpu'] += stage_cpu
+                
+        return {
+            'wall': wall,
+            'cpu': cpu,
+            'stages': {
+                name: {'wall': stage_wall, 'cpu': stage_cpu, 'calls': calls}
+                for name, (stage_wall, stage_cpu, calls) in self.stages.items()
+            },
+            'devices': sorted(devices.values(), key=lambda device: device['wall'], reverse=True)
+        }
+
+# Active profiler for this process; None (the default) makes stage timing a no-op
+PROFILER: Optional[StageProfiler] = None
+
+def profile_stage(name: str):
+    return PROFILER.stage(name) if PROFILER is not None else nullcontext()
+
+def profile_device(**info):
+    return PROFILER.device(**info) if PROFILER is not None else nullcontext()
+
+def parse_config_file_profiled(filepath: Path, data: Optional[bytes] = None) -> Tuple[Optional[DeviceConfig], Dict]:
+    """Worker-process entry point that returns the file's timings with the device"""
+    global PROFILER
+    PROFILER = StageProfiler()
+    device = ConfigParser.parse_config_file(filepath, data)
+    return device, PROFILER.export()
+
+class ParseManifest:
+    """Content-hash manifest of parsed configs, so unchanged files skip parsing.
+    
+    Entries are keyed by config file name and hold the file's SHA-256 and the
+    parsed device. The whole manifest is discarded when this script changes,
+    since cached devices would no longer match what the parser produces.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.parser_hash = file_digest(Path(__file__)) or ""
+        self.entries: Dict[str, Dict] = {}
+        
+    def load(self):
+        """Load cached entries, ignoring missing, corrupt or outdated manifests"""
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {self.path}: {e}")
+            return
+        if data.get('version') == MANIFEST_VERSION and data.get('parser') == self.parser_hash:
+            self.entries = data.get('configs', {})
+            
+    def lookup(self, filename: str, digest: Optional[str]) -> Optional[Dict]:
+        """Return the cached entry for a file if its contents are unchanged"""
+        entry = self.entries.get(filename)
+        if digest and entry and entry['sha256'] == digest:
+            return entry
+        return None
+        
+    def record(self, filename: str, digest: Optional[str], device: Optional[DeviceConfig]):
+        """Remember the parse result for a file's current contents"""
+        if digest:
+            self.entries[filename] = {
+                'sha256': digest,
+                'device': device.to_dict() if device else None
+            }
+        else:
+            self.entries.pop(filename, None)
+            
+    def save(self, filenames: List[str]) -> bool:
+        """Write the manifest, dropping entries for config files that no longer exist"""
+        keep = set(filenames)
+        self.entries = {name: entry for name, entry in self.entries.items() if name in keep}
+        content = json.dumps({
+            'version': MANIFEST_VERSION,
+            'parser': self.parser_hash,
+            'configs': self.entries
+        })  # not sort_keys: interface order is significant
+        try:
+            return write_if_changed(self.path, content)
+        except OSError as e:
+            print(f"Could not write manifest {self.path}: {e}")
+            return False
+
+# Characters read from the top of a config to identify its OS (the version/hostname banner)
+HEADER_SIZE = 2048
+
+# Banner signatures checked against a config's header, in order
+OS_SIGNATURES: List[Tuple[str, re.Pattern]] = [
+    ("aruba-cx", re.compile(r'^!Version AOS-CX', re.M)),
+    # IOS/IOS-XE "show running-config" banner or a bare "version 15.6" line; NX-OS
+    # ("version 9.3(8)"), Junos ("version 18.1R3;") and IOS-XR banners do not match
+    ("cisco-ios", re.compile(r'^(?:Current configuration : \d+ bytes|version \d+\.\d+[ \t]*$)', re.M)),
+]
+
+def detect_device_os(header: str) -> str:
+    """Detect the device operating system from the start of a config (its banner)"""
+    header = header[:HEADER_SIZE]
+    for device_os, signature in OS_SIGNATURES:
+        if signature.search(header):
+            return device_os
+    return "unknown"
+
+def detect_device_os_from_body(config_text: str) -> str:
+    """Fallback for configs without a recognizable banner: scan the whole text"""
+    if "Version AOS-CX" in config_text:
         return "aruba-cx"
     elif "version " in config_text and ("IOS XE" in config_text or "Cisco" in config_text):
         return "cisco-ios"
@@ -46,6 +456,21 @@ def detect_device_os(config_text: str) -> str:
     else:
         return "unknown"
 
+# Vendor parser class names by detected OS. Classes are looked up on first use
+# and one stateless instance per OS is reused for every file in the process
+VENDOR_PARSERS: Dict[str, str] = {
+    "cisco-ios": "CiscoConfigParser",
+    "aruba-cx": "ArubaConfigParser",
+}
+_vendor_parsers: Dict[str, object] = {}
+
+def get_vendor_parser(device_os: str):
+    """The shared parser instance for an OS, or None if no parser handles it"""
+    parser = _vendor_parsers.get(device_os)
+    if parser is None and device_os in VENDOR_PARSERS:
+        parser = _vendor_parsers[device_os] = globals()[VENDOR_PARSERS[device_os]]()
+    return parser
+
 def detect_device_role(hostname: str) -> str:
     """Detect device role based on hostname patterns"""
     hostname_lower = hostname.lower()
@@ -80,187 +505,296 @@ def detect_device_role(hostname: str) -> str:
     # Default to generic device type based on configuration
     return 'unknown'
 
+def split_config_blocks(config_text: str) -> List[Tuple[str, str]]:
+    """Split configuration text into top-level (header, body) blocks in one pass.
+    
+    A block starts at any unindented line that is not blank or a '!' comment and
+    owns the indented and blank lines that follow it. The next unindented line
+    ('!' separators included) closes it. Bodies keep their original lines, each
+    terminated by a newline, so per-block regexes behave as they did against
+    the whole file.
+    """
+    blocks = []
+    header = None
+    body: List[str] = []
+    for line in config_text.splitlines():
+        if not line.strip() or line[0] in ' \t':
+            if header is not None:
+                body.append(line + '\n')
+            continue
+        if header is not None:
+            blocks.append((header, ''.join(body)))
+        header = None if line.startswith('!') else line.rstrip()
+        body = []
+    if header is not None:
+        blocks.append((header, ''.join(body)))
+    return blocks
+
+def find_block(blocks: List[Tuple[str, str]], pattern: str) -> Optional[Tuple[re.Match, str]]:
+    """Return the match and body of the first block whose header matches pattern"""
+    header_re = re.compile(pattern)
+    for header, body in blocks:
+        match = header_re.fullmatch(header)
+        if match:
+            return match, body
+    return None
+
 class ConfigParser:
     """Base parser class - detects device type and delegates to appropriate parser"""
     
-    def __init__(self, config_dir: str):
+    def __init__(self, config_dir: str, jobs: int = 1, manifest: Optional[ParseManifest] = None,
+                 pool: Optional[ProcessPoolExecutor] = None):
         self.config_dir = Path(config_dir)
+        self.jobs = jobs  # 1 parses serially in this process (easiest to debug)
+        self.manifest = manifest  # None parses every file on every run
+        self.pool = pool  # Shared worker pool (batch mode); None starts one per run
         self.devices = {}
         
     def parse_all_configs(self) -> Dict[str, DeviceConfig]:
         """Parse all .conf files in the directory"""
-        for conf_file in self.config_dir.glob("*.conf"):
-            device = self.parse_config_file(conf_file)
-            if device:
-                self.devices[device.hostname] = device
+        conf_files = sorted(self.config_dir.glob("*.conf"))
+        
+        # Reuse cached devices for configs whose contents have not changed.
+        # Changed configs are parsed from the bytes that were hashed, so no
+        # file is read twice
+        cached = []
+        to_parse = conf_files
+        contents: List[Optional[bytes]] = [None] * len(conf_files)
+        digests = {}
+        if self.manifest is not None:
+            to_parse = []
+            contents = []
+            for conf_file in conf_files:
+                with profile_stage('hash'):
+                    data, digests[conf_file] = read_with_digest(conf_file)
+                entry = self.manifest.lookup(conf_file.name, digests[conf_file])
+                if entry is None:
+                    to_parse.append(conf_file)
+                    contents.append(data)
+                elif entry['device']:
+                    cached.append(DeviceConfig.from_dict(entry['device']))
+            if len(to_parse) < len(conf_files):
+                print(f"Reusing {len(conf_files) - len(to_parse)} unchanged config(s), "
+                      f"parsing {len(to_parse)}")
+        
+        parsed = None
+        if self.jobs > 1 and len(to_parse) > 1:
+            try:
+                parsed = self._parse_parallel(to_parse, contents)
+            except (OSError, BrokenProcessPool) as e:
+                print(f"Process pool unavailable ({e}), falling back to serial parsing")
+        if parsed is None:
+            parsed = [self.parse_config_file(conf_file, data) for conf_file, data in zip(to_parse, contents)]
+            
+        if self.manifest is not None:
+            for conf_file, device in zip(to_parse, parsed):
+                self.manifest.record(conf_file.name, digests[conf_file], device)
+            self.manifest.save([conf_file.name for conf_file in conf_files])
+            
+        # Merge deterministically by hostname (for duplicates the last file name wins)
+        for device in sorted(filter(None, cached + parsed), key=lambda d: (d.hostname, d.filename)):
+            if device.hostname in self.devices:
+                print(f"Duplicate hostname {device.hostname} in {device.filename}, "
+                      f"replacing {self.devices[device.hostname].filename}")
+            self.devices[device.hostname] = device
         return self.devices
         
-    def parse_config_file(self, filepath: Path) -> Optional[DeviceConfig]:
-        """Parse a single configuration file by detecting device type"""
+    def _parse_parallel(self, conf_files: List[Path],
+                        contents: List[Optional[bytes]]) -> List[Optional[DeviceConfig]]:
+        """Fan parse_config_file out over a process pool, preserving file order"""
+        workers = min(self.jobs, len(conf_files))
+        chunksize = max(1, len(conf_files) // (workers * 4))
+        # When profiling, workers send their timings back alongside each device
+        worker = parse_config_file_profiled if PROFILER is not None else self.parse_config_file
+        if self.pool is not None:
+            results = list(self.pool.map(worker, conf_files, contents, chunksize=chunksize))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(worker, conf_files, contents, chunksize=chunksize))
+                
+        if PROFILER is None:
+            return results
+        for _, timings in results:
+            PROFILER.merge(timings)
+        return [device for device, _ in results]
+        
+    @staticmethod
+    def parse_config_file(filepath: Path, data: Optional[bytes] = None) -> Optional[DeviceConfig]:
+        """Parse a single configuration file by detecting device type (from data if already read)"""
+        with profile_device(file=filepath.name) as record:
+            device = ConfigParser._parse_file(filepath, data)
+            if record is not None and device is not None:
+                record['hostname'] = device.hostname
+            return device
+            
+    @staticmethod
+    def _parse_file(filepath: Path, data: Optional[bytes] = None) -> Optional[DeviceConfig]:
         try:
-            with open(filepath, 'r') as f:
-                config_text = f.read()
+            # Bytes already read are decoded exactly as open() would decode the file
+            with open(filepath, 'r') if data is None else io.TextIOWrapper(io.BytesIO(data)) as f:
+                # Identify the OS from the banner, then read the rest of the same handle
+                with profile_stage('read'):
+                    header = f.read(HEADER_SIZE)
+                with profile_stage('detect_os'):
+                    device_os = detect_device_os(header)
+                with profile_stage('read'):
+                    config_text = header + f.read()
         except Exception as e:
             print(f"Error reading {filepath}: {e}")
             return None
             
-        # Detect device OS type
-        device_os = detect_device_os(config_text)
+        if device_os == "unknown":
+            with profile_stage('detect_os'):
+                device_os = detect_device_os_from_body(config_text)
         print(f"Detected device OS: {device_os} for {filepath.name}")
         
-        # Use appropriate parser based on device type
-        if device_os == "cisco-ios":
-            parser = CiscoConfigParser()
-            return parser.parse_config(config_text, filepath.name)
-        elif device_os == "aruba-cx":
-            parser = ArubaConfigParser()
-            return parser.parse_config(config_text, filepath.name)
-        else:
+        # Use the shared parser for this device type
+        parser = get_vendor_parser(device_os)
+        if parser is None:
             print(f"Unknown device type for {filepath.name}, skipping...")
             return None
+        return parser.parse_config(config_text, filepath.name)
 
 class CiscoConfigParser:
     """Parser for Cisco IOS/IOS-XE configuration files"""
     
     def parse_config(self, config_text: str, filename: str) -> Optional[DeviceConfig]:
         """Parse Cisco configuration text"""
+        with profile_stage('tokenize'):
+            blocks = split_config_blocks(config_text)
+        
         # Extract hostname
-        hostname_match = re.search(r'^hostname\s+(\S+)', config_text, re.MULTILINE)
-        if not hostname_match:
+        hostname_block = find_block(blocks, r'hostname\s+(\S+).*')
+        if not hostname_block:
             print(f"No hostname found in {filename}")
             return None
             
-        hostname = hostname_match.group(1)
+        hostname = hostname_block[0].group(1)
         device = DeviceConfig(hostname, filename)
         device.device_type = "router"  # Default for Cisco
         
         # Extract device model from license line
-        model_match = re.search(r'license udi pid\s+(\S+)', config_text, re.MULTILINE)
-        if model_match:
-            device.model = model_match.group(1)
+        model_block = find_block(blocks, r'license udi pid\s+(\S+).*')
+        if model_block:
+            device.model = intern(model_block[0].group(1))
             
         # Parse interfaces
-        self._parse_interfaces(config_text, device)
+        with profile_stage('interfaces'):
+            self._parse_interfaces(blocks, device)
         
         # Parse routing protocols
-        self._parse_routing_protocols(config_text, device)
+        with profile_stage('routing'):
+            self._parse_routing_protocols(blocks, device)
         
         return device
         
-    def _parse_interfaces(self, config_text: str, device: DeviceConfig):
+    def _parse_interfaces(self, blocks: List[Tuple[str, str]], device: DeviceConfig):
         """Parse Cisco interface configurations"""
-        # Find all interface blocks
-        interface_pattern = r'^interface\s+(\S+)\s*\n((?:(?!^interface|^router|^!).*\n)*)'
-        interfaces = re.findall(interface_pattern, config_text, re.MULTILINE)
-        
-        for intf_name, intf_config in interfaces:
-            config_dict = {
-                'name': intf_name,
-                'status': 'up',  # Default
-                'description': '',
-                'ip_address': '',
-                'subnet_mask': '',
-                'negotiation': '',
-                'other_config': []
-            }
+        # Interface headers name a single interface ("interface GigabitEthernet1")
+        interface_re = re.compile(r'interface\s+(\S+)\s*')
+
+        for header, intf_config in blocks:
+            header_match = interface_re.fullmatch(header)
+            if not header_match:
+                continue
+            intf_name = header_match.group(1)
+            status = 'up'  # Default
+            ip_address = ''
+            subnet_mask = ''
+            description = ''
+            negotiation = ''
             
             # Check for "no ip address" first
             if 'no ip address' in intf_config:
-                config_dict['status'] = 'no_ip'
+                status = 'no_ip'
             else:
                 # Parse IP address (only if not "no ip address")
                 ip_match = re.search(r'^\s*ip address\s+(\S+)\s+(\S+)', intf_config, re.MULTILINE)
                 if ip_match:
-                    config_dict['ip_address'] = ip_match.group(1)
-                    config_dict['subnet_mask'] = ip_match.group(2)
+                    ip_address = ip_match.group(1)
+                    subnet_mask = ip_match.group(2)
                 
             # Parse description
             desc_match = re.search(r'description\s+(.+)', intf_config)
             if desc_match:
-                config_dict['description'] = desc_match.group(1).strip()
+                description = desc_match.group(1).strip()
                 
             # Parse negotiation
             if 'negotiation auto' in intf_config:
-                config_dict['negotiation'] = 'auto'
+                negotiation = 'auto'
                 
             # Store other configuration lines
+            known_lines = [
+                f'ip address {ip_address} {subnet_mask}',
+                'no ip address',
+                'negotiation auto',
+                f'description {description}'
+            ]
+            other_config = []
             for line in intf_config.split('\n'):
                 line = line.strip()
-                if line and not line.startswith('!') and line not in [
-                    f'ip address {config_dict["ip_address"]} {config_dict["subnet_mask"]}',
-                    'no ip address',
-                    'negotiation auto',
-                    f'description {config_dict["description"]}'
-                ]:
-                    config_dict['other_config'].append(line)
+                if line and not line.startswith('!') and line not in known_lines:
+                    other_config.append(line)
+                    
+            interface = InterfaceConfig(
+                name=intf_name,
+                status=status,
+                description=description,
+                ip_address=ip_address,
+                subnet_mask=subnet_mask,
+                negotiation=negotiation,
+                other_config=other_config
+            )
             
             # Categorize interface
             if intf_name.startswith('Loopback'):
-                device.add_loopback(intf_name, config_dict)
+                device.add_loopback(intf_name, interface)
             else:
-                device.add_interface(intf_name, config_dict)
+                device.add_interface(intf_name, interface)
                 
-    def _parse_routing_protocols(self, config_text: str, device: DeviceConfig):
+    def _parse_routing_protocols(self, blocks: List[Tuple[str, str]], device: DeviceConfig):
         """Parse Cisco routing protocol configurations"""
         # Parse BGP
-        bgp_match = re.search(r'^router bgp\s+(\d+)\s*\n((?:(?!^router|^interface|^!).*\n)*)', 
-                             config_text, re.MULTILINE)
-        if bgp_match:
-            asn = bgp_match.group(1)
-            bgp_config = bgp_match.group(2)
-            
-            bgp_data = {
-                'asn': asn,
-                'neighbors': [],
-                'address_families': [],
-                'redistribute': []
-            }
+        bgp_block = find_block(blocks, r'router bgp\s+(\d+)\s*')
+        if bgp_block:
+            asn = bgp_block[0].group(1)
+            bgp_config = bgp_block[1]
+            
+            bgp_data = BgpConfig(asn=asn)
             
             # Parse neighbors
             neighbor_pattern = r'neighbor\s+(\S+)\s+remote-as\s+(\d+)'
             neighbors = re.findall(neighbor_pattern, bgp_config)
             for neighbor_ip, remote_asn in neighbors:
-                bgp_data['neighbors'].append({
-                    'ip': neighbor_ip,
-                    'remote_asn': remote_asn
-                })
+                bgp_data.neighbors.append(BgpNeighbor(ip=neighbor_ip, remote_asn=remote_asn))
                 
             # Parse redistribution
             if 'redistribute connected' in bgp_config:
-                bgp_data['redistribute'].append('connected')
+                bgp_data.redistribute.append('connected')
                 
             device.add_routing_protocol('bgp', bgp_data)
             
         # Parse OSPF
-        ospf_match = re.search(r'^router ospf\s+(\d+)\s*\n((?:(?!^router|^interface|^!).*\n)*)', 
-                              config_text, re.MULTILINE)
-        if ospf_match:
-            process_id = ospf_match.group(1)
-            ospf_config = ospf_match.group(2)
-            
-            ospf_data = {
-                'process_id': process_id,
-                'router_id': '',
-                'networks': [],
-                'areas': []
-            }
+        ospf_block = find_block(blocks, r'router ospf\s+(\d+)\s*')
+        if ospf_block:
+            process_id = ospf_block[0].group(1)
+            ospf_config = ospf_block[1]
+            
+            ospf_data = OspfConfig(process_id=process_id)
             
             # Parse router-id
             router_id_match = re.search(r'router-id\s+(\S+)', ospf_config)
             if router_id_match:
-                ospf_data['router_id'] = router_id_match.group(1)
+                ospf_data.router_id = router_id_match.group(1)
                 
             # Parse networks and areas
             network_pattern = r'network\s+(\S+)\s+(\S+)\s+area\s+(\d+)'
             networks = re.findall(network_pattern, ospf_config)
             for network, wildcard, area in networks:
-                ospf_data['networks'].append({
-                    'network': network,
-                    'wildcard': wildcard,
-                    'area': area
-                })
-                if area not in ospf_data['areas']:
-                    ospf_data['areas'].append(area)
+                ospf_network = OspfNetwork(network=network, wildcard=wildcard, area=area)
+                ospf_data.networks.append(ospf_network)
+                if ospf_network.area not in ospf_data.areas:
+                    ospf_data.areas.append(ospf_network.area)
                     
             device.add_routing_protocol('ospf', ospf_data)
 
@@ -269,48 +803,49 @@ class ArubaConfigParser:
     
     def parse_config(self, config_text: str, filename: str) -> Optional[DeviceConfig]:
         """Parse Aruba OS-CX configuration text"""
+        with profile_stage('tokenize'):
+            blocks = split_config_blocks(config_text)
+        
         # Extract hostname
-        hostname_match = re.search(r'^hostname\s+(\S+)', config_text, re.MULTILINE)
-        if not hostname_match:
+        hostname_block = find_block(blocks, r'hostname\s+(\S+).*')
+        if not hostname_block:
             print(f"No hostname found in {filename}")
             return None
             
-        hostname = hostname_match.group(1)
+        hostname = hostname_block[0].group(1)
         device = DeviceConfig(hostname, filename)
         device.device_type = "switch"  # Default for Aruba switches
         
         # Extract device model from version line
         version_match = re.search(r'!Version AOS-CX (.+)', config_text)
         if version_match:
-            device.model = f"AOS-CX {version_match.group(1)}"
+            device.model = intern(f"AOS-CX {version_match.group(1)}")
             
         # Parse interfaces
-        self._parse_interfaces(config_text, device)
+        with profile_stage('interfaces'):
+            interfaces = self._interface_blocks(blocks)
+            self._parse_interfaces(interfaces, device)
         
         # Parse routing protocols
-        self._parse_routing_protocols(config_text, device)
+        with profile_stage('routing'):
+            self._parse_routing_protocols(blocks, interfaces, device)
         
         return device
         
-    def _parse_interfaces(self, config_text: str, device: DeviceConfig):
-        """Parse Aruba interface configurations"""
-        # Find all interface blocks - Aruba uses different indentation
-        interface_pattern = r'^interface\s+(\S+.*?)\n((?:(?:^\s{4}.*|^\s*$)\n)*)'
-        interfaces = re.findall(interface_pattern, config_text, re.MULTILINE)
+    def _interface_blocks(self, blocks: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Select interface blocks - Aruba names may contain spaces ("lag 1")"""
+        interface_re = re.compile(r'interface\s+(\S.*)')
+        interfaces = []
+        for header, body in blocks:
+            match = interface_re.fullmatch(header)
+            if match:
+                interfaces.append((match.group(1).strip(), body))
+        return interfaces
         
+    def _parse_interfaces(self, interfaces: List[Tuple[str, str]], device: DeviceConfig):
+        """Parse Aruba interface configurations"""
         for intf_name, intf_config in interfaces:
-            intf_name = intf_name.strip()
-            config_dict = {
-                'name': intf_name,
-                'status': 'up',  # Default
-                'description': '',
-                'ip_address': '',
-                'subnet_mask': '',
-                'negotiation': '',
-                'other_config': [],
-                'lag_member': False,
-                'lag_id': None
-            }
+            interface = InterfaceConfig(name=intf_name)
             
             # Parse IP address with CIDR notation
             ip_match = re.search(r'^\s*ip address\s+(\S+/\d+)', intf_config, re.MULTILINE)
@@ -318,101 +853,89 @@ class ArubaConfigParser:
                 ip_cidr = ip_match.group(1)
                 try:
                     interface_ip = ipaddress.IPv4Interface(ip_cidr)
-                    config_dict['ip_address'] = str(interface_ip.ip)
-                    config_dict['subnet_mask'] = str(interface_ip.network.netmask)
+                    interface.ip_address = str(interface_ip.ip)
+                    interface.subnet_mask = intern(str(interface_ip.network.netmask))
                 except:
                     # If parsing fails, store as-is
-                    config_dict['ip_address'] = ip_cidr
-                    config_dict['subnet_mask'] = ''
+                    interface.ip_address = ip_cidr
+                    interface.subnet_mask = ''
             
             # Check for DHCP
             if 'ip dhcp' in intf_config:
-                config_dict['ip_address'] = 'dhcp'
-                config_dict['subnet_mask'] = ''
+                interface.ip_address = 'dhcp'
+                interface.subnet_mask = ''
                 
             # Parse LAG membership
             lag_match = re.search(r'^\s*lag\s+(\d+)', intf_config, re.MULTILINE)
             if lag_match:
-                config_dict['lag_member'] = True
-                config_dict['lag_id'] = lag_match.group(1)
+                interface.lag_member = True
+                interface.lag_id = intern(lag_match.group(1))
                 
             # Parse shutdown status
             if 'no shutdown' not in intf_config:
-                config_dict['status'] = 'down'
+                interface.status = 'down'
                 
             # Store other configuration lines
-            for line in intf_config.split('\n'):
-                line = line.strip()
-                if line and not line.startswith('!') and 'ip address' not in line and 'no shutdown' not in line:
-                    config_dict['other_config'].append(line)
+            interface.other_config = tuple(
+                line for line in (raw.strip() for raw in intf_config.split('\n'))
+                if line and not line.startswith('!') and 'ip address' not in line and 'no shutdown' not in line
+            )
             
             # Add LAG information for D2 compatibility
             if intf_name.startswith('lag'):
-                config_dict['port_channel'] = True
-                config_dict['protocol'] = 'LACP'  # Aruba LAG uses LACP
+                interface.port_channel = True
+                interface.protocol = 'LACP'  # Aruba LAG uses LACP
                 
             # Categorize interface
             if intf_name.startswith('loopback'):
-                device.add_loopback(intf_name, config_dict)
+                device.add_loopback(intf_name, interface)
             else:
-                device.add_interface(intf_name, config_dict)
+                device.add_interface(intf_name, interface)
                 
-    def _parse_routing_protocols(self, config_text: str, device: DeviceConfig):
+    def _parse_routing_protocols(self, blocks: List[Tuple[str, str]],
+                                 interfaces: List[Tuple[str, str]], device: DeviceConfig):
         """Parse Aruba routing protocol configurations"""
         # Parse OSPF - Aruba format is similar but simpler
-        ospf_match = re.search(r'^router ospf\s+(\d+)\s*\n((?:(?:^\s{4}.*|^\s*$)\n)*)', 
-                              config_text, re.MULTILINE)
-        if ospf_match:
-            process_id = ospf_match.group(1)
-            ospf_config = ospf_match.group(2)
-            
-            ospf_data = {
-                'process_id': process_id,
-                'router_id': '',
-                'networks': [],
-                'areas': []
-            }
+        ospf_block = find_block(blocks, r'router ospf\s+(\d+)\s*')
+        if ospf_block:
+            process_id = ospf_block[0].group(1)
+            ospf_config = ospf_block[1]
+            
+            ospf_data = OspfConfig(process_id=process_id)
             
             # Parse router-id
             router_id_match = re.search(r'^\s*router-id\s+(\S+)', ospf_config, re.MULTILINE)
             if router_id_match:
-                ospf_data['router_id'] = router_id_match.group(1)
+                ospf_data.router_id = router_id_match.group(1)
                 
             # Parse areas
             area_match = re.search(r'^\s*area\s+(\S+)', ospf_config, re.MULTILINE)
             if area_match:
-                ospf_data['areas'].append(area_match.group(1))
+                ospf_data.areas.append(intern(area_match.group(1)))
                     
             device.add_routing_protocol('ospf', ospf_data)
             
         # Parse interface-level OSPF (Aruba assigns OSPF to interfaces directly)
-        interface_ospf_pattern = r'interface\s+(\S+.*?)\n((?:(?:^\s{4}.*|^\s*$)\n)*)'
-        interface_blocks = re.findall(interface_ospf_pattern, config_text, re.MULTILINE)
-        
         ospf_interfaces = []
-        for intf_name, intf_config in interface_blocks:
+        for intf_name, intf_config in interfaces:
             ospf_match = re.search(r'ip ospf\s+(\d+)\s+area\s+(\S+)', intf_config)
             if ospf_match:
-                process_id = ospf_match.group(1)
-                area = ospf_match.group(2)
-                ospf_interfaces.append({
-                    'interface': intf_name.strip(),
-                    'process_id': process_id,
-                    'area': area
-                })
+                ospf_interfaces.append(OspfInterface(
+                    interface=intf_name,
+                    process_id=ospf_match.group(1),
+                    area=ospf_match.group(2)
+                ))
                 
         if ospf_interfaces:
             # Update or create OSPF data with interface information
             if 'ospf' not in device.routing_protocols:
-                device.add_routing_protocol('ospf', {
-                    'process_id': ospf_interfaces[0]['process_id'],
-                    'router_id': '',
-                    'networks': [],
-                    'areas': list(set([intf['area'] for intf in ospf_interfaces])),
-                    'interfaces': ospf_interfaces
-                })
+                device.add_routing_protocol('ospf', OspfConfig(
+                    process_id=ospf_interfaces[0].process_id,
+                    areas=list(dict.fromkeys(intf.area for intf in ospf_interfaces)),
+                    interfaces=ospf_interfaces
+                ))
             else:
-                device.routing_protocols['ospf']['interfaces'] = ospf_interfaces
+                device.routing_protocols['ospf'].interfaces = ospf_interfaces
 
 class D2Generator:
     """Generates D2 files from parsed device configurations"""
@@ -430,263 +953,259 @@ class D2Generator:
             }
         
         # Generate individual device files
-        self._generate_device_files(output_dir)
+        written = self._generate_device_files(output_dir)
         
         # Generate main.d2 file
-        self._generate_main_file(output_dir, site_info)
-        
-        print(f"Generated {len(self.devices)} device files and main.d2 in {output_dir}")
+        if self._generate_main_file(output_dir, site_info):
+            written += 1
         
-    def _generate_main_file(self, output_dir: Path, site_info: Dict):
-        """Generate main.d2 with device list and connections"""
-        main_content = []
+        print(f"Generated {len(self.devices)} device files and main.d2 in {output_dir} "
+              f"({written} changed)")
         
+    def _generate_main_file(self, output_dir: Path, site_info: Dict) -> bool:
+        """Generate main.d2 with device list and connections, returning whether it changed"""
+        # Write main.d2 (only if its content changed)
+        main_file = output_dir / "main.d2"
+        with profile_stage('render'):
+            return stream_if_changed(main_file, self._render_main(site_info))
+            
+    def _render_main(self, site_info: Dict) -> Iterator[str]:
+        """Render main.d2 line by line, emitting connections as they are found"""
         # Header comments
-        main_content.append(f"# {site_info['name']}")
-        main_content.append(f"# Location: {site_info['location']}")
-        main_content.append(f"# Description: {site_info['description']}")
-        main_content.append(f"# Device Count: {len(self.devices)} devices")
-        main_content.append("")
+        yield f"# {site_info['name']}"
+        yield f"# Location: {site_info['location']}"
+        yield f"# Description: {site_info['description']}"
+        yield f"# Device Count: {len(self.devices)} devices"
+        yield ""
         
         # Device list - references to individual device files
-        main_content.append("# Device List - Individual device configurations are in separate .d2 files")
-        main_content.append("devices: {")
+        yield "# Device List - Individual device configurations are in separate .d2 files"
+        yield "devices: {"
         for hostname in sorted(self.devices.keys()):
-            main_content.append(f"  {hostname}")
-        main_content.append("}")
-        main_content.append("")
+            yield f"  {hostname}"
+        yield "}"
+        yield ""
         
         # Connections
-        main_content.append("# Connection Topology - All site connections defined here")
-        main_content.append("# This prevents duplicate connections across device files")
-        main_content.append("")
-        
-        connections = self._detect_connections()
-        for connection in connections:
-            main_content.append(f"{connection['device1']}.{connection['interface1']} -> "
-                              f"{connection['device2']}.{connection['interface2']}")
+        yield "# Connection Topology - All site connections defined here"
+        yield "# This prevents duplicate connections across device files"
+        yield ""
         
-        # Write main.d2
-        main_file = output_dir / "main.d2"
-        with open(main_file, 'w') as f:
-            f.write('\n'.join(main_content))
+        for connection in self._iter_connections():
+            yield (f"{connection['device1']}.{connection['interface1']} -> "
+                   f"{connection['device2']}.{connection['interface2']}")
             
-    def _generate_device_files(self, output_dir: Path):
-        """Generate individual device .d2 files"""
+    def _generate_device_files(self, output_dir: Path) -> int:
+        """Generate individual device .d2 files, returning how many changed"""
         # Create devices subdirectory if it doesn't exist
         devices_dir = output_dir / "devices"
         devices_dir.mkdir(exist_ok=True)
         
+        written = 0
         for hostname, device in self.devices.items():
-            device_content = []
-            
-            # Header comment
-            device_content.append(f"# {hostname} - {device.model}")
-            
-            # Device definition
-            device_content.append(f"{hostname}: {{")
-            device_content.append(f'  label: "{hostname}"')
-            
-            # Determine device type
-            device_type = self._determine_device_type(device)
-            device_content.append(f'  type: "{device_type}"')
+            # Stream the device file into the devices subdirectory (only if its content changed)
+            device_file = devices_dir / f"{hostname}.d2"
+            with profile_device(hostname=hostname), profile_stage('render'):
+                if stream_if_changed(device_file, self._render_device(hostname, device)):
+                    written += 1
+                    
+        print(f"Generated individual device files: {', '.join(self.devices.keys())}")
+        return written
+        
+    def _render_device(self, hostname: str, device: DeviceConfig) -> Iterator[str]:
+        """Render one device's .d2 file line by line"""
+        # Header comment
+        yield f"# {hostname} - {device.model}"
+        
+        # Device definition
+        yield f"{hostname}: {{"
+        yield f'  label: "{hostname}"'
+        
+        # Determine device type
+        device_type = self._determine_device_type(device)
+        yield f'  type: "{device_type}"'
+        
+        # Add device role
+        yield f'  role: "{device.device_role}"'
+        
+        if device.model:
+            yield f'  model: "{device.model}"'
             
-            # Add device role
-            device_content.append(f'  role: "{device.device_role}"')
+        # Management IP
+        mgmt_ip = self._get_management_ip(device)
+        if mgmt_ip:
+            yield f'  mgmt_ip: "{mgmt_ip}"'
             
-            if device.model:
-                device_content.append(f'  model: "{device.model}"')
+        yield ""
+        yield "  # Interface Configuration"
+        
+        # Add interfaces
+        for intf_name, intf_config in device.interfaces.items():
+            if intf_config.ip_address and intf_config.status != 'no_ip':
+                yield f"  {intf_name}: {{"
                 
-            # Management IP
-            mgmt_ip = self._get_management_ip(device)
-            if mgmt_ip:
-                device_content.append(f'  mgmt_ip: "{mgmt_ip}"')
+                # Add description if available
+                if intf_config.description:
+                    yield f'    description: "{intf_config.description}"'
                 
-            device_content.append("")
-            device_content.append("  # Interface Configuration")
-            
-            # Add interfaces
-            for intf_name, intf_config in device.interfaces.items():
-                if intf_config['ip_address'] and intf_config['status'] != 'no_ip':
-                    device_content.append(f"  {intf_name}: {{")
-                    
-                    # Add description if available
-                    if intf_config['description']:
-                        device_content.append(f'    description: "{intf_config["description"]}"')
-                    
-                    # Add basic interface properties
-                    device_content.append(f'    switchport_mode: "routed"')
-                    device_content.append(f'    status: "up"')
-                    device_content.append(f'    bandwidth: "1Gbps"')  # Default for GigE interfaces
-                    device_content.append(f'    ip_address: "{intf_config["ip_address"]}"')
-                    device_content.append(f'    subnet_mask: "{intf_config["subnet_mask"]}"')
-                    
-                    # Add port channel information for LAG interfaces
-                    if intf_config.get('port_channel'):
-                        device_content.append(f'    protocol: "LACP"')
-                        device_content.append(f'    port_channel: "true"')
-                    
-                    # Add OSPF properties if device has OSPF enabled
-                    if 'ospf' in device.routing_protocols:
-                        ospf_config = device.routing_protocols['ospf']
-                        # Find the OSPF network that matches this interface
-                        intf_network = self._get_interface_network(intf_config)
-                        ospf_area = self._find_ospf_area_for_network(intf_network, ospf_config)
-                        if ospf_area:
-                            device_content.append(f'    ospf_area: "{ospf_area}"')
-                            device_content.append(f'    ospf_cost: "10"')  # Default cost
-                            device_content.append(f'    ospf_network_type: "point-to-point"')
-                    
-                    device_content.append("  }")
-                    
-            # Add routing protocols
-            if device.routing_protocols:
-                device_content.append("")
-                device_content.append("  # Routing Configuration")
-                for protocol, config in device.routing_protocols.items():
-                    if protocol == 'bgp':
-                        device_content.append(f"  bgp_enabled: \"true\"")
-                        device_content.append(f'  bgp_as: "{config["asn"]}"')
-                        # Format neighbors as comma-separated string as expected by frontend
-                        neighbor_list = [f"{neighbor['ip']} AS{neighbor['remote_asn']}" for neighbor in config['neighbors']]
-                        device_content.append(f'  bgp_neighbors: "{", ".join(neighbor_list)}"')
-                    elif protocol == 'ospf':
-                        device_content.append(f"  ospf_enabled: \"true\"")
-                        device_content.append(f'  ospf_process_id: "{config["process_id"]}"')
-                        device_content.append(f'  ospf_router_id: "{config["router_id"]}"')
-                        if config['areas']:
-                            device_content.append(f'  ospf_areas: "{",".join(config["areas"])}"')
-                            
-            device_content.append("}")
-            
-            # Write device file to devices subdirectory
-            device_file = devices_dir / f"{hostname}.d2"
-            with open(device_file, 'w') as f:
-                f.write('\n'.join(device_content))
+                # Add basic interface properties
+                yield f'    switchport_mode: "routed"'
+                yield f'    status: "up"'
+                yield f'    bandwidth: "1Gbps"'  # Default for GigE interfaces
+                yield f'    ip_address: "{intf_config.ip_address}"'
+                yield f'    subnet_mask: "{intf_config.subnet_mask}"'
                 
-        print(f"Generated individual device files: {', '.join(self.devices.keys())}")
+                # Add port channel information for LAG interfaces
+                if intf_config.port_channel:
+                    yield f'    protocol: "LACP"'
+                    yield f'    port_channel: "true"'
+                
+                # Add OSPF properties if device has OSPF enabled
+                if 'ospf' in device.routing_protocols:
+                    ospf_config = device.routing_protocols['ospf']
+                    # Find the OSPF network that matches this interface
+                    intf_network = self._get_interface_network(intf_config)
+                    ospf_area = self._find_ospf_area_for_network(intf_network, ospf_config)
+                    if ospf_area:
+                        yield f'    ospf_area: "{ospf_area}"'
+                        yield f'    ospf_cost: "10"'  # Default cost
+                        yield f'    ospf_network_type: "point-to-point"'
+                
+                yield "  }"
+                
+        # Add routing protocols
+        if device.routing_protocols:
+            yield ""
+            yield "  # Routing Configuration"
+            for protocol, config in device.routing_protocols.items():
+                if protocol == 'bgp':
+                    yield f"  bgp_enabled: \"true\""
+                    yield f'  bgp_as: "{config.asn}"'
+                    # Format neighbors as comma-separated string as expected by frontend
+                    neighbor_list = [f"{neighbor.ip} AS{neighbor.remote_asn}" for neighbor in config.neighbors]
+                    yield f'  bgp_neighbors: "{", ".join(neighbor_list)}"'
+                elif protocol == 'ospf':
+                    yield f"  ospf_enabled: \"true\""
+                    yield f'  ospf_process_id: "{config.process_id}"'
+                    yield f'  ospf_router_id: "{config.router_id}"'
+                    if config.areas:
+                        yield f'  ospf_areas: "{",".join(config.areas)}"'
+                        
+        yield "}"
         
-    def _get_interface_network(self, intf_config):
+    def _get_interface_network(self, intf_config: InterfaceConfig):
         """Get network address for interface"""
         try:
             import ipaddress
             network = ipaddress.IPv4Network(
-                f"{intf_config['ip_address']}/{intf_config['subnet_mask']}", 
+                f"{intf_config.ip_address}/{intf_config.subnet_mask}", 
                 strict=False
             )
             return str(network.network_address)
         except:
             return None
             
-    def _find_ospf_area_for_network(self, intf_network, ospf_config):
+    def _find_ospf_area_for_network(self, intf_network, ospf_config: OspfConfig):
         """Find OSPF area for a given network"""
-        if not intf_network or not ospf_config.get('networks'):
+        if not intf_network or not ospf_config.networks:
             return None
             
-        for network_config in ospf_config['networks']:
-            network_addr = network_config['network']
+        for network_config in ospf_config.networks:
+            network_addr = network_config.network
             if intf_network == network_addr:
-                return network_config['area']
+                return network_config.area
         return None
         
-    def _generate_device_definitions(self) -> List[str]:
+    def _generate_device_definitions(self) -> Iterator[str]:
         """Generate device definition blocks"""
-        lines = []
-        
         for hostname, device in self.devices.items():
-            lines.append(f"{hostname}: {{")
-            lines.append(f'  label: "{hostname}"')
+            yield f"{hostname}: {{"
+            yield f'  label: "{hostname}"'
             
             # Determine device type based on model or configuration
             device_type = self._determine_device_type(device)
-            lines.append(f'  type: "{device_type}"')
+            yield f'  type: "{device_type}"'
             
             if device.model:
-                lines.append(f'  model: "{device.model}"')
+                yield f'  model: "{device.model}"'
                 
             # Add management IP (usually loopback0)
             mgmt_ip = self._get_management_ip(device)
             if mgmt_ip:
-                lines.append(f'  mgmt_ip: "{mgmt_ip}"')
+                yield f'  mgmt_ip: "{mgmt_ip}"'
                 
             # Add interfaces
             for intf_name, intf_config in device.interfaces.items():
-                if intf_config['ip_address'] and intf_config['status'] != 'no_ip':  # Only include interfaces with IP addresses
-                    lines.append(f"  {intf_name}: {{")
-                    if intf_config['description']:
-                        lines.append(f'    description: "{intf_config["description"]}"')
-                    lines.append(f'    ip_address: "{intf_config["ip_address"]}"')
-                    lines.append(f'    subnet_mask: "{intf_config["subnet_mask"]}"')
-                    lines.append(f'    status: "up"')
-                    lines.append("  }")
+                if intf_config.ip_address and intf_config.status != 'no_ip':  # Only include interfaces with IP addresses
+                    yield f"  {intf_name}: {{"
+                    if intf_config.description:
+                        yield f'    description: "{intf_config.description}"'
+                    yield f'    ip_address: "{intf_config.ip_address}"'
+                    yield f'    subnet_mask: "{intf_config.subnet_mask}"'
+                    yield f'    status: "up"'
+                    yield "  }"
                     
             # Add routing protocols
             for protocol, config in device.routing_protocols.items():
                 if protocol == 'bgp':
-                    lines.append(f"  routing: {{")
-                    lines.append(f'    bgp: {{')
-                    lines.append(f'      asn: "{config["asn"]}"')
-                    lines.append(f'      neighbors: [')
-                    for neighbor in config['neighbors']:
-                        lines.append(f'        "{neighbor["ip"]} AS{neighbor["remote_asn"]}"')
-                    lines.append(f'      ]')
-                    lines.append(f'    }}')
-                    lines.append(f"  }}")
+                    yield f"  routing: {{"
+                    yield f'    bgp: {{'
+                    yield f'      asn: "{config.asn}"'
+                    yield f'      neighbors: ['
+                    for neighbor in config.neighbors:
+                        yield f'        "{neighbor.ip} AS{neighbor.remote_asn}"'
+                    yield f'      ]'
+                    yield f'    }}'
+                    yield f"  }}"
                     
-            lines.append("}")
-            lines.append("")
-            
-        return lines
+            yield "}"
+            yield ""
         
-    def _generate_connections(self) -> List[str]:
+    def _generate_connections(self) -> Iterator[str]:
         """Generate connection definitions by analyzing IP subnets"""
-        lines = ["# Connections"]
-        connections = self._detect_connections()
-        
-        for connection in connections:
-            lines.append(f"{connection['device1']}.{connection['interface1']} -> "
-                        f"{connection['device2']}.{connection['interface2']}")
+        yield "# Connections"
+        for connection in self._iter_connections():
+            yield (f"{connection['device1']}.{connection['interface1']} -> "
+                   f"{connection['device2']}.{connection['interface2']}")
             
-        return lines
-        
     def _detect_connections(self) -> List[Dict]:
         """Detect connections between devices based on IP subnets"""
-        connections = []
+        return list(self._iter_connections())
         
-        # Build a list of all interfaces with IP addresses
-        all_interfaces = []
-        for hostname, device in self.devices.items():
-            for intf_name, intf_config in device.interfaces.items():
-                if intf_config['ip_address'] and intf_config['subnet_mask']:
-                    try:
-                        network = ipaddress.IPv4Network(
-                            f"{intf_config['ip_address']}/{intf_config['subnet_mask']}", 
-                            strict=False
-                        )
-                        all_interfaces.append({
-                            'device': hostname,
-                            'interface': intf_name,
-                            'ip': intf_config['ip_address'],
-                            'network': network
-                        })
-                    except:
-                        continue
+    def _iter_connections(self) -> Iterator[Dict]:
+        """Link devices whose interfaces share a subnet: O(interfaces) links in total"""
+        # Bucket interfaces with IP addresses by network so only peers are compared
+        with profile_stage('links'):
+            segments: Dict[ipaddress.IPv4Network, List[Tuple[str, str]]] = {}
+            for hostname, device in self.devices.items():
+                for intf_name, intf_config in device.interfaces.items():
+                    if intf_config.ip_address and intf_config.subnet_mask:
+                        try:
+                            network = ipaddress.IPv4Network(
+                                f"{intf_config.ip_address}/{intf_config.subnet_mask}", 
+                                strict=False
+                            )
+                        except ValueError:
+                            continue
+                        segments.setdefault(network, []).append((hostname, intf_name))
                         
-        # Find interfaces on the same subnet
-        for i, intf1 in enumerate(all_interfaces):
-            for intf2 in all_interfaces[i+1:]:
-                if (intf1['network'] == intf2['network'] and 
-                    intf1['device'] != intf2['device']):
-                    connections.append({
-                        'device1': intf1['device'],
-                        'interface1': intf1['interface'],
-                        'device2': intf2['device'],
-                        'interface2': intf2['interface'],
-                        'subnet': str(intf1['network'])
-                    })
+        # Segments are emitted in the order their first interface was scanned.
+        # Point-to-point subnets yield their one link; on a multi-access segment
+        # (a shared LAN, transit or management VLAN) the first interface scanned
+        # is the designated member and every member on another device links to
+        # it, so a segment of k interfaces yields at most k - 1 links, not k²/2
+        for network, members in segments.items():
+            device1, interface1 = members[0]
+            for device2, interface2 in members[1:]:
+                if device1 != device2:
+                    yield {
+                        'device1': device1,
+                        'interface1': interface1,
+                        'device2': device2,
+                        'interface2': interface2,
+                        'subnet': str(network)
+                    }
                     
-        return connections
-        
     def _determine_device_type(self, device: DeviceConfig) -> str:
         """Determine device type based on model and configuration"""
         # Cisco devices
@@ -713,61 +1232,240 @@ class D2Generator:
     def _get_management_ip(self, device: DeviceConfig) -> Optional[str]:
         """Get management IP address (usually Loopback0)"""
         if 'Loopback0' in device.loopbacks:
-            return device.loopbacks['Loopback0'].get('ip_address')
+            return device.loopbacks['Loopback0'].ip_address
         return None
 
+def generate_site(config_dir: Path, output_dir: Path, site_info: Dict, jobs: int = 1,
+                  force: bool = False, pool: Optional[ProcessPoolExecutor] = None) -> Dict[str, DeviceConfig]:
+    """Parse one site's configs and write its D2 files, returning the parsed devices"""
+    if not output_dir.exists():
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+    print(f"Parsing configurations from: {config_dir}")
+    print(f"Output directory: {output_dir}")
+    if PROFILER is not None:
+        PROFILER.site = site_info['name']
+    
+    # Parse configurations, reusing cached results for unchanged files
+    manifest = ParseManifest(output_dir / MANIFEST_NAME)
+    if not force:
+        manifest.load()
+    config_parser = ConfigParser(config_dir, jobs=jobs, manifest=manifest, pool=pool)
+    devices = config_parser.parse_all_configs()
+    
+    if not devices:
+        return devices
+        
+    print(f"Parsed {len(devices)} devices:")
+    for hostname, device in devices.items():
+        protocols = list(device.routing_protocols.keys())
+        print(f"  - {hostname} ({device.model}) - Protocols: {', '.join(protocols) if protocols else 'None'}")
+        
+    # Generate D2 files
+    generator = D2Generator(devices)
+    generator.generate_d2_files(output_dir, site_info)
+    return devices
+
+def read_site_header(main_d2: Path, defaults: Dict) -> Dict:
+    """The name, location and description written at the top of an existing
+    main.d2, with defaults for any it does not have (or if there is no file)"""
+    site_info = dict(defaults)
+    try:
+        with open(main_d2, 'r') as f:
+            header = [f.readline().strip() for _ in range(3)]
+    except OSError:
+        return site_info
+        
+    if header[0].startswith("# "):
+        site_info['name'] = header[0][2:]
+    for line in header[1:]:
+        for field in ('location', 'description'):
+            prefix = f"# {field.title()}: "
+            if line.startswith(prefix):
+                site_info[field] = line[len(prefix):]
+    return site_info
+
+def load_batch_sites(batch_path: Path, defaults: Dict) -> List[Dict]:
+    """List the sites for batch mode from a JSON manifest or a root directory.
+    
+    A manifest is a JSON list of {"config_dir", "output_dir", "name",
+    "location", "description"} objects; only config_dir is required, relative
+    paths are resolved against the manifest's folder and output_dir defaults
+    to the parent of config_dir. A directory is searched for <site>/configs
+    folders, with each site written next to its configs.
+    
+    Fields a manifest entry leaves out are kept from the header of the site's
+    existing main.d2, so regenerating does not overwrite user-authored names;
+    only new sites get the folder name and the defaults.
+    """
+    if batch_path.is_dir():
+        entries = [{'config_dir': configs_dir.relative_to(batch_path)}
+                   for configs_dir in sorted(batch_path.rglob("configs")) if configs_dir.is_dir()]
+        base = batch_path
+    else:
+        with open(batch_path, 'r') as f:
+            entries = json.load(f)
+        base = batch_path.parent
+        
+    sites = []
+    for entry in entries:
+        config_dir = base / entry['config_dir']
+        output_dir = base / entry['output_dir'] if entry.get('output_dir') else config_dir.parent
+        site_info = read_site_header(output_dir / "main.d2", {
+            'name': output_dir.name,
+            'location': defaults['location'],
+            'description': defaults['description']
+        })
+        site_info.update((field, entry[field]) for field in ('name', 'location', 'description') if field in entry)
+        sites.append({
+            'config_dir': config_dir,
+            'output_dir': output_dir,
+            'site_info': site_info
+        })
+    return sites
+
+def run_batch(sites: List[Dict], jobs: int, force: bool) -> bool:
+    """Generate every site in this process, sharing one worker pool, then print a summary"""
+    results = []
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        for site in sites:
+            started = time.perf_counter()
+            error = None
+            devices = {}
+            print(f"\n=== {site['site_info']['name']} ({site['config_dir']}) ===")
+            try:
+                if not site['config_dir'].is_dir():
+                    raise FileNotFoundError(f"Config directory not found: {site['config_dir']}")
+                devices = generate_site(site['config_dir'], site['output_dir'], site['site_info'],
+                                        jobs=jobs, force=force, pool=pool)
+                if not devices:
+                    error = "No devices found or parsed successfully"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            results.append((site, len(devices), time.perf_counter() - started, error))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+            
+    # Per-site summary
+    print(f"\nBatch summary ({len(results)} sites):")
+    for site, device_count, elapsed, error in results:
+        status = f"FAILED - {error}" if error else f"{device_count} devices"
+        print(f"  {elapsed:8.2f}s  {site['site_info']['name']}: {status}")
+    failed = sum(1 for result in results if result[3])
+    total = sum(result[2] for result in results)
+    print(f"Total {total:.2f}s, {len(results) - failed} succeeded, {failed} failed")
+    return failed == 0
+
+def write_profile_report(report: Dict, report_path: Path, top: int):
+    """Write the --profile JSON report and print the stage totals and slowest devices"""
+    report_path.write_text(json.dumps(report, indent=2))
+    
+    print(f"\nProfile ({report['wall']:.3f}s wall, {report['cpu']:.3f}s CPU in this process):")
+    print(f"  {'stage':<12} {'wall':>10} {'cpu':>10} {'calls':>8}")
+    for name, stage in sorted(report['stages'].items(), key=lambda item: item[1]['wall'], reverse=True):
+        print(f"  {name:<12} {stage['wall']:>9.4f}s {stage['cpu']:>9.4f}s {stage['calls']:>8}")
+        
+    if top > 0 and report['devices']:
+        print(f"Slowest {min(top, len(report['devices']))} devices:")
+        for device in report['devices'][:top]:
+            name = f"{device['site']}/{device['hostname']}" if device['site'] else device['hostname']
+            print(f"  {device['wall']:.4f}s  {name} ({device['file']})")
+    print(f"Profile report written to {report_path}")
+
 def main():
     """Main function to parse configs and generate D2 files"""
     import argparse
     import sys
     
     parser = argparse.ArgumentParser(description='Parse Cisco configs and generate D2 topology files')
-    parser.add_argument('--config-dir', '-c', required=True, 
+    parser.add_argument('--config-dir', '-c',
                        help='Directory containing .conf files')
-    parser.add_argument('--output-dir', '-o', required=True,
+    parser.add_argument('--output-dir', '-o',
                        help='Output directory for D2 files')
+    parser.add_argument('--batch', '-b',
+                       help='Process many sites in one run: a JSON site manifest, or a root '
+                            'directory searched for <site>/configs folders')
     parser.add_argument('--site-name', '-n', default='Network Topology',
                        help='Site name for the topology')
     parser.add_argument('--location', '-l', default='Unknown',
                        help='Site location')
     parser.add_argument('--description', '-d', default='Auto-generated from device configurations',
                        help='Site description')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Parallel parser processes (1 = serial, 0 = one per CPU)')
+    parser.add_argument('--force', '-f', action='store_true',
+                       help=f'Re-parse every config, ignoring the {MANIFEST_NAME} cache')
+    parser.add_argument('--profile', action='store_true',
+                       help='Time each stage and device, write a JSON report and print the slowest devices')
+    parser.add_argument('--profile-report', default='parser-profile.json',
+                       help='Where --profile writes its JSON report')
+    parser.add_argument('--profile-top', type=int, default=10,
+                       help='How many of the slowest devices --profile prints')
+    parser.add_argument('--cprofile', metavar='PSTATS',
+                       help='Also run under cProfile and dump stats to this .pstats file '
+                            '(covers this process only, not --jobs workers)')
     
     args = parser.parse_args()
     
+    if not args.batch and (not args.config_dir or not args.output_dir):
+        parser.error("--config-dir and --output-dir are required unless --batch is given")
+        
+    global PROFILER
+    if args.profile:
+        PROFILER = StageProfiler()
+    started_wall, started_cpu = time.perf_counter(), time.process_time()
+    
+    cprofile = None
+    if args.cprofile:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    try:
+        status = run(args)
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(args.cprofile)
+            print(f"cProfile stats written to {args.cprofile}")
+        if PROFILER is not None:
+            report = PROFILER.report(time.perf_counter() - started_wall, time.process_time() - started_cpu)
+            write_profile_report(report, Path(args.profile_report), args.profile_top)
+    sys.exit(status)
+    
+def run(args) -> int:
+    """Run a single-site or batch generation, returning the exit status"""
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    
+    if args.batch:
+        batch_path = Path(args.batch)
+        if not batch_path.exists():
+            print(f"Batch manifest or directory not found: {batch_path}")
+            return 1
+        sites = load_batch_sites(batch_path, {'location': args.location, 'description': args.description})
+        if not sites:
+            print(f"No sites found in {batch_path}")
+            return 1
+        return 0 if run_batch(sites, jobs, args.force) else 1
+        
     config_dir = Path(args.config_dir)
     output_dir = Path(args.output_dir)
     
     if not config_dir.exists():
         print(f"Config directory not found: {config_dir}")
-        sys.exit(1)
-        
-    if not output_dir.exists():
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-    print(f"Parsing configurations from: {config_dir}")
-    print(f"Output directory: {output_dir}")
-    
-    # Parse configurations
-    config_parser = ConfigParser(config_dir)
-    devices = config_parser.parse_all_configs()
-    
-    if not devices:
-        print("No devices found or parsed successfully")
-        sys.exit(1)
-        
-    print(f"Parsed {len(devices)} devices:")
-    for hostname, device in devices.items():
-        protocols = list(device.routing_protocols.keys())
-        print(f"  - {hostname} ({device.model}) - Protocols: {', '.join(protocols) if protocols else 'None'}")
+        return 1
         
-    # Generate D2 files
-    generator = D2Generator(devices)
-    generator.generate_d2_files(output_dir, {
+    devices = generate_site(config_dir, output_dir, {
         'name': args.site_name,
         'location': args.location,
         'description': args.description
-    })
+    }, jobs=jobs, force=args.force)
+    
+    if not devices:
+        print("No devices found or parsed successfully")
+        return 1
+    return 0
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
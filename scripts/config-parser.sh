@@ -32,17 +32,20 @@ CONFIG_DIR="${1:-$DEFAULT_CONFIG_DIR}"
 OUTPUT_DIR="${2:-$DEFAULT_OUTPUT_DIR}"
 SITE_NAME="${3:-$DEFAULT_SITE_NAME}"
 LOCATION="${4:-$DEFAULT_LOCATION}"
+JOBS="${5:-1}"
 
 echo "📁 Config directory: $CONFIG_DIR"
 echo "📂 Output directory: $OUTPUT_DIR"
 echo "🏢 Site: $SITE_NAME"
 echo "📍 Location: $LOCATION"
+echo "⚙️  Parser jobs: $JOBS"
 
 python scripts/config-parser.py \
     --config-dir "$CONFIG_DIR" \
     --output-dir "$OUTPUT_DIR" \
     --site-name "$SITE_NAME" \
     --location "$LOCATION" \
-    --description "Auto-generated from device configurations"
+    --description "Auto-generated from device configurations" \
+    --jobs "$JOBS"
 
 echo "✅ Config parsing complete!"
\ No newline at end of file
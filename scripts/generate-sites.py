@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Synthetic Site Generator
+Writes realistic Cisco IOS and Aruba AOS-CX configs into a nested
+region/site tree, for load testing the config parser and the API
+"""
+
+import argparse
+import ipaddress
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from script_loader import load_script
+
+# Named scales: total devices spread over a number of sites
+PRESETS = {
+    'small': {'devices': 10, 'sites': 1},
+    'medium': {'devices': 1000, 'sites': 100},
+    'large': {'devices': 50000, 'sites': 5000},
+}
+
+ROUTERS_PER_SITE = 2
+CORES_PER_SITE = 2
+
+class AddressPlan:
+    """Hands out non-overlapping subnets and loopbacks across the whole estate"""
+
+    def __init__(self):
+        self._next_link = int(ipaddress.IPv4Address('10.0.0.0'))
+        self._next_loopback = int(ipaddress.IPv4Address('172.16.0.1'))
+        self._next_uplink = int(ipaddress.IPv4Address('100.64.0.0'))
+
+    def _allocate(self, attr: str, prefix: int) -> ipaddress.IPv4Network:
+        size = 2 ** (32 - prefix)
+        start = -(-getattr(self, attr) // size) * size  # align to the subnet size
+        setattr(self, attr, start + size)
+        return ipaddress.IPv4Network((start, prefix))
+
+    def link(self, prefix: int = 30) -> ipaddress.IPv4Network:
+        return self._allocate('_next_link', prefix)
+
+    def uplink(self) -> ipaddress.IPv4Network:
+        return self._allocate('_next_uplink', 30)
+
+    def loopback(self) -> ipaddress.IPv4Address:
+        address = ipaddress.IPv4Address(self._next_loopback)
+        self._next_loopback += 1
+        return address
+
+def wildcard(network: ipaddress.IPv4Network) -> str:
+    return str(network.hostmask)
+
+class SiteBuilder:
+    """Builds the device configs for one site: routers, a core pair and access switches"""
+
+    def __init__(self, site_number: int, device_count: int, plan: AddressPlan, rng: random.Random):
+        self.site_number = site_number
+        self.plan = plan
+        self.rng = rng
+        self.routers = min(ROUTERS_PER_SITE, device_count)
+        self.cores = min(CORES_PER_SITE, device_count - self.routers)
+        self.access = device_count - self.routers - self.cores
+
+        # Per-device interface lists, filled in as links are allocated
+        self.interfaces: Dict[str, List[Dict]] = {}
+
+    # Hostnames follow the role conventions detect_device_role() expects
+    def router_name(self, index: int) -> str:
+        return f"r{self.site_number:04d}r{index + 1}"
+
+    def core_name(self, index: int) -> str:
+        return f"s{self.site_number:04d}c{index + 1}"
+
+    def access_name(self, index: int) -> str:
+        return f"s{self.site_number:04d}a{index + 1:03d}"
+
+    def _add(self, hostname: str, **interface):
+        self.interfaces.setdefault(hostname, []).append(interface)
+
+    def build(self) -> Dict[str, str]:
+        """Return {hostname: config text} for every device in the site"""
+        routers = [self.router_name(i) for i in range(self.routers)]
+        cores = [self.core_name(i) for i in range(self.cores)]
+        access = [self.access_name(i) for i in range(self.access)]
+
+        # Routers: ISP uplink each, plus a point-to-point link between the pair
+        for router in routers:
+            uplink = self.plan.uplink()
+            self._add(router, kind='uplink', network=uplink, address=uplink[1], peer=uplink[2])
+        if len(routers) == 2:
+            link = self.plan.link(31)
+            self._add(routers[0], kind='p2p', network=link, address=link[0], peer=link[1])
+            self._add(routers[1], kind='p2p', network=link, address=link[1], peer=link[0])
+
+        # Routers and cores share one multi-access transit segment
+        transit_members = routers + cores
+        if len(transit_members) > 1:
+            transit = self.plan.link(29)
+            for offset, hostname in enumerate(transit_members):
+                self._add(hostname, kind='transit', network=transit, address=transit[offset + 1])
+
+        # Core pair interconnect over a LAG
+        if len(cores) == 2:
+            link = self.plan.link(31)
+            self._add(cores[0], kind='lag', network=link, address=link[0])
+            self._add(cores[1], kind='lag', network=link, address=link[1])
+
+        # Access switches are dual-homed to the core pair (or the routers in tiny sites)
+        parents = cores or routers
+        for switch in access:
+            for parent in parents:
+                link = self.plan.link(30)
+                self._add(parent, kind='downlink', network=link, address=link[1])
+                self._add(switch, kind='uplink-access', network=link, address=link[2])
+
+        configs = {}
+        for router in routers:
+            configs[router] = self._cisco_router(router)
+        for hostname in cores + access:
+            configs[hostname] = self._aruba_switch(hostname)
+        return configs
+
+    def _serial(self) -> str:
+        return ''.join(self.rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(11))
+
+    def _cisco_router(self, hostname: str) -> str:
+        loopback = self.plan.loopback()
+        asn = 64512 + self.site_number % 1000
+        lines = [
+            f"Current configuration : {self.rng.randint(1800, 9000)} bytes",
+            "!",
+            f"! Last configuration change at {self.rng.randint(0, 23):02d}:{self.rng.randint(0, 59):02d}:13 UTC Tue Jun 3 2025",
+            "!",
+            "version 15.6",
+            "service timestamps debug datetime msec",
+            "service timestamps log datetime msec",
+            "platform console serial",
+            "!",
+            f"hostname {hostname}",
+            "!",
+            "boot-start-marker",
+            "boot-end-marker",
+            "!",
+            "no aaa new-model",
+            "!",
+            f"ip domain name site{self.site_number:04d}.example.net",
+            "!",
+            f"license udi pid CSR1000V sn {self._serial()}",
+            "!",
+            "spanning-tree extend system-id",
+            "!",
+            "username admin privilege 15 secret 5 $1$Ido2$3.q5xYbt8TBlgLOWnYhBg.",
+            "!",
+            "lldp run",
+            "cdp run",
+            "!",
+            "interface Loopback0",
+            f" ip address {loopback} 255.255.255.255",
+            "!",
+        ]
+
+        ospf_networks = [(ipaddress.IPv4Network(loopback), '0')]
+        bgp_neighbors = []
+        for number, intf in enumerate(self.interfaces.get(hostname, []), start=1):
+            network = intf['network']
+            lines.append(f"interface GigabitEthernet{number}")
+            if intf['kind'] == 'uplink':
+                lines.append(f" description ISP uplink {self._serial()[:6]}")
+                bgp_neighbors.append((intf['peer'], 7018, 'ISP'))
+            else:
+                if intf['kind'] == 'p2p':
+                    bgp_neighbors.append((intf['peer'], asn, 'iBGP'))
+                lines.append(f" description {intf['kind']} {network}")
+                ospf_networks.append((network, '0'))
+            lines.append(f" ip address {intf['address']} {network.netmask}")
+            lines.append(" negotiation auto")
+            lines.append("!")
+
+        # A few unused ports, as on real chassis
+        for number in range(len(self.interfaces.get(hostname, [])) + 1, 7):
+            lines.extend([f"interface GigabitEthernet{number}", " no ip address", " shutdown", " negotiation auto", "!"])
+
+        lines.extend(["router ospf 1", f" router-id {loopback}"])
+        for network, area in ospf_networks:
+            lines.append(f" network {network.network_address} {wildcard(network)} area {area}")
+        lines.append("!")
+
+        lines.extend([f"router bgp {asn}", " bgp log-neighbor-changes"])
+        for neighbor, remote_asn, description in bgp_neighbors:
+            lines.append(f" neighbor {neighbor} remote-as {remote_asn}")
+            lines.append(f" neighbor {neighbor} description {description}")
+        lines.extend([
+            " !",
+            " address-family ipv4",
+            "  redistribute connected",
+        ])
+        for neighbor, _, _ in bgp_neighbors:
+            lines.append(f"  neighbor {neighbor} activate")
+        lines.extend([
+            " exit-address-family",
+            "!",
+            "ip forward-protocol nd",
+            "!",
+            "no ip http server",
+            "no ip http secure-server",
+            "!",
+            "line con 0",
+            " stopbits 1",
+            "line vty 0 4",
+            " login local",
+            " transport input ssh",
+            "!",
+            "end",
+        ])
+        return '\n'.join(lines) + '\n'
+
+    def _aruba_switch(self, hostname: str) -> str:
+        loopback = self.plan.loopback()
+        lines = [
+            "!",
+            "!Version AOS-CX Virtual.10.15.1020",
+            "!export-password: default",
+            f"hostname {hostname}",
+            f"user admin group administrators password ciphertext {self._serial()}{self._serial()}",
+            "ntp server pool.ntp.org minpoll 4 maxpoll 4 iburst",
+            "ntp enable",
+            "!",
+            "ssh server vrf mgmt",
+            "vlan 1",
+            "interface mgmt",
+            "    no shutdown",
+            "    ip dhcp",
+        ]
+
+        port = 1
+        lag_members = []
+        for intf in self.interfaces.get(hostname, []):
+            network = intf['network']
+            if intf['kind'] == 'lag':
+                lines.extend([
+                    "interface lag 1",
+                    "    no shutdown",
+                    f"    ip address {intf['address']}/{network.prefixlen}",
+                    "    lacp mode active",
+                    "    ip ospf 1 area 0.0.0.0",
+                ])
+                lag_members = [port, port + 1]
+                port += 2
+                continue
+            lines.extend([
+                f"interface 1/1/{port}",
+                "    no shutdown",
+                f"    description {intf['kind']}",
+                f"    ip address {intf['address']}/{network.prefixlen}",
+                "    ip ospf 1 area 0.0.0.0",
+            ])
+            port += 1
+
+        for member in lag_members:
+            lines.extend([f"interface 1/1/{member}", "    no shutdown", "    lag 1"])
+
+        lines.extend([
+            "interface loopback 0",
+            f"    ip address {loopback}/32",
+            "    ip ospf 1 area 0.0.0.0",
+            "!",
+            "router ospf 1",
+            f"    router-id {loopback}",
+            "    area 0.0.0.0",
+            "https-server vrf mgmt",
+        ])
+        return '\n'.join(lines) + '\n'
+
+def site_path(site_number: int, depth: int, fanout: int) -> Path:
+    """Place a site under `depth` levels of regions, `fanout` children per region"""
+    parts = []
+    remaining = site_number // fanout
+    for level in range(depth):
+        prefix = 'region' if level == depth - 1 else 'area'
+        parts.append(f"{prefix}-{remaining % fanout:02d}")
+        remaining //= fanout
+    parts.reverse()
+    parts.append(f"site-{site_number:04d}")
+    return Path(*parts)
+
+def generate_sites(output_dir: Path, devices: int, sites: int, depth: int = 1,
+                   fanout: int = 50, seed: int = 0) -> List[Path]:
+    """Write a synthetic estate and return the per-site configs directories.
+
+    The same arguments always produce byte-identical files, so runs at a given
+    scale are comparable over time.
+    """
+    if devices < sites:
+        raise ValueError(f"Need at least one device per site ({devices} devices, {sites} sites)")
+    rng = random.Random(seed)
+    plan = AddressPlan()
+    config_dirs = []
+
+    per_site, extra = divmod(devices, sites)
+    for site_number in range(sites):
+        site_devices = per_site + (1 if site_number < extra else 0)
+        config_dir = output_dir / site_path(site_number, depth, fanout) / "configs"
+        config_dir.mkdir(parents=True, exist_ok=True)
+
+        builder = SiteBuilder(site_number, site_devices, plan, rng)
+        for hostname, config in builder.build().items():
+            (config_dir / f"{hostname}.conf").write_text(config)
+        config_dirs.append(config_dir)
+    return config_dirs
+
+def main():
+    """Generate a synthetic estate, optionally rendering it to D2"""
+    parser = argparse.ArgumentParser(description='Generate synthetic device configs for load testing')
+    parser.add_argument('--output-dir', '-o', required=True,
+                       help='Root directory for the generated region/site tree')
+    parser.add_argument('--preset', '-p', choices=sorted(PRESETS),
+                       help='Named scale (small: 10 devices/1 site, medium: 1k/100, large: 50k/5k)')
+    parser.add_argument('--devices', type=int, help='Total number of devices')
+    parser.add_argument('--sites', type=int, help='Number of sites to spread the devices over')
+    parser.add_argument('--depth', type=int, default=1,
+                       help='Region levels above each site (default: 1)')
+    parser.add_argument('--fanout', type=int, default=50,
+                       help='Children per region (default: 50)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--render', action='store_true',
+                       help='Also run config-parser.py in batch mode to write the D2 files')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Parser processes for --render (1 = serial, 0 = one per CPU)')
+
+    args = parser.parse_args()
+
+    scale = dict(PRESETS[args.preset]) if args.preset else {'devices': 10, 'sites': 1}
+    if args.devices:
+        scale['devices'] = args.devices
+    if args.sites:
+        scale['sites'] = args.sites
+
+    output_dir = Path(args.output_dir)
+    try:
+        config_dirs = generate_sites(output_dir, scale['devices'], scale['sites'],
+                                     depth=args.depth, fanout=args.fanout, seed=args.seed)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    print(f"Generated {scale['devices']} devices across {len(config_dirs)} sites in {output_dir}")
+
+    if args.render:
+        config_parser = load_script("config_parser", "config-parser.py")
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        sites = config_parser.load_batch_sites(output_dir, {
+            'location': 'Synthetic',
+            'description': 'Generated by generate-sites.py'
+        })
+        if not config_parser.run_batch(sites, jobs, force=False):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Script loader
+Imports the scripts in this folder whose file names are not valid module
+names (config-parser.py, generate-sites.py) so the API, the benchmarks and
+the other scripts can reuse them
+"""
+
+import importlib.util
+import sys
+import threading
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+
+_load_lock = threading.Lock()
+
+def load_script(module_name: str, file_name: str):
+    """Import scripts/<file_name> as module_name, once per process.
+
+    The module is registered in sys.modules before it runs, so parser worker
+    processes can unpickle the records it defines.
+    """
+    with _load_lock:
+        module = sys.modules.get(module_name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / file_name)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[module_name]
+                raise
+        return module
@@ -16,8 +16,8 @@ window.NodeListPanel = ({
     const topology = getCurrentTopology();
     if (!topology?.d2) return [];
 
-    // Parse the topology to get device list
-    const graphData = window.parseD2ToGraph(topology.d2);
+    // Use the API-parsed graph when available, otherwise parse the topology here
+    const graphData = topology.graph || window.parseD2ToGraph(topology.d2);
     return graphData.nodes || [];
   };
 
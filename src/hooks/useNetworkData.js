@@ -2,10 +2,11 @@
 // Updated to use FastAPI backend instead of direct file access
 
 window.useNetworkData = () => {
-  const { useState, useEffect } = React;
+  const { useState, useEffect, useRef } = React;
   const [networkData, setNetworkData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const pendingSitesRef = useRef(new Set());
 
   // Detect if we're running with the API backend
   const API_BASE_URL = window.location.port === '8000' ? '' : 'http://localhost:8000';
@@ -27,29 +28,83 @@ window.useNetworkData = () => {
     };
   };
 
-  // Load data from API
-  const loadFromAPI = async () => {
+  // Insert a site into the region/site tree, mirroring the API's hierarchy shape
+  const addToHierarchy = (hierarchy, siteKey, siteData) => {
+    const pathParts = siteKey.split('.');
+    let currentLevel = hierarchy;
+    pathParts.forEach((part, i) => {
+      if (i === pathParts.length - 1) {
+        currentLevel[part] = { type: 'site', data: siteData };
+      } else {
+        if (!currentLevel[part]) {
+          currentLevel[part] = { type: 'region', children: {} };
+        }
+        currentLevel = currentLevel[part].children;
+      }
+    });
+  };
+
+  // Keep D2 bodies that were already fetched when newer listing data arrives
+  const mergeListing = (prev, listing) => {
+    if (!prev) return listing;
+    const sites = { ...listing.sites };
+    Object.entries(prev.sites || {}).forEach(([siteKey, site]) => {
+      if (sites[siteKey] && site.d2 !== undefined) {
+        sites[siteKey] = { ...sites[siteKey], d2: site.d2, graph: site.graph };
+      }
+    });
+    return { ...listing, sites };
+  };
+
+  // Load data from API as an NDJSON stream, reporting partial data as sites arrive
+  const loadFromAPI = async (onProgress) => {
     try {
       console.log("🚀 Loading network data from API...");
       
-      const response = await fetch(`${API_BASE_URL}/api/sites`);
+      // Only fetch metadata and hierarchy here; D2 bodies are loaded per site
+      const response = await fetch(`${API_BASE_URL}/api/sites/stream?fields=summary`);
       if (!response.ok) {
         throw new Error(`API request failed: ${response.status} ${response.statusText}`);
       }
       
-      const apiData = await response.json();
+      const sites = {};
+      let hierarchy = {};
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+
+      while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+
+        let sitesAdded = false;
+        lines.filter(line => line.trim()).forEach(line => {
+          const record = JSON.parse(line);
+          if (record.type === 'site') {
+            sites[record.key] = record.site;
+            addToHierarchy(hierarchy, record.key, record.site);
+            sitesAdded = true;
+          } else if (record.type === 'hierarchy') {
+            hierarchy = record.hierarchy;
+          }
+        });
+
+        if (sitesAdded) {
+          onProgress({ sites: { ...sites }, hierarchy: { ...hierarchy } });
+        }
+        if (done) break;
+      }
       
-      if (!apiData.sites || Object.keys(apiData.sites).length === 0) {
+      if (Object.keys(sites).length === 0) {
         throw new Error("No sites found in API response");
       }
 
-      console.log(`✅ Successfully loaded ${Object.keys(apiData.sites).length} sites from API`);
-      console.log(`🗂️ Hierarchy structure:`, apiData.hierarchy);
+      console.log(`✅ Successfully loaded ${Object.keys(sites).length} sites from API`);
+      console.log(`🗂️ Hierarchy structure:`, hierarchy);
       
-      return {
-        sites: apiData.sites,
-        hierarchy: apiData.hierarchy
-      };
+      return { sites, hierarchy };
       
     } catch (err) {
       console.error("❌ API Error:", err);
@@ -120,6 +175,47 @@ window.useNetworkData = () => {
     }
   };
 
+  // Fetch a single site's D2 body and server-parsed graph on demand (no-op if already loaded)
+  const loadSiteTopology = async (siteKey) => {
+    const site = networkData?.sites?.[siteKey];
+    if (!site || site.d2 !== undefined || pendingSitesRef.current.has(siteKey)) return;
+
+    pendingSitesRef.current.add(siteKey);
+    try {
+      console.log(`📥 Loading topology for site: ${siteKey}`);
+      const siteUrl = `${API_BASE_URL}/api/sites/${encodeURIComponent(siteKey)}`;
+      const [siteResponse, graphResponse] = await Promise.all([
+        fetch(siteUrl),
+        fetch(`${siteUrl}/graph`).catch(() => null)
+      ]);
+      if (!siteResponse.ok) {
+        throw new Error(`API request failed: ${siteResponse.status} ${siteResponse.statusText}`);
+      }
+
+      const siteData = await siteResponse.json();
+
+      // The parsed graph is optional; without it the browser parses the D2 itself
+      let graph = null;
+      if (graphResponse?.ok) {
+        const graphData = await graphResponse.json();
+        graph = { ...graphData, interfaces: new Map(Object.entries(graphData.interfaces)) };
+      }
+
+      setNetworkData(prev => ({
+        ...prev,
+        sites: {
+          ...prev.sites,
+          [siteKey]: { ...prev.sites[siteKey], d2: siteData.d2, graph }
+        }
+      }));
+    } catch (err) {
+      console.error(`❌ Error loading site ${siteKey}:`, err);
+      setError(err);
+    } finally {
+      pendingSitesRef.current.delete(siteKey);
+    }
+  };
+
   useEffect(() => {
     const loadNetworkData = async () => {
       try {
@@ -130,7 +226,11 @@ window.useNetworkData = () => {
         
         if (useAPI) {
           try {
-            data = await loadFromAPI();
+            // Show the tree as soon as the first sites arrive
+            data = await loadFromAPI((partialData) => {
+              setNetworkData(prev => mergeListing(prev, partialData));
+              setLoading(false);
+            });
           } catch (apiError) {
             console.warn("⚠️ API unavailable, falling back to direct file access");
             data = await loadFromFiles();
@@ -139,7 +239,7 @@ window.useNetworkData = () => {
           data = await loadFromFiles();
         }
 
-        setNetworkData(data);
+        setNetworkData(prev => mergeListing(prev, data));
         
       } catch (err) {
         console.error("❌ Error loading network data:", err);
@@ -152,5 +252,5 @@ window.useNetworkData = () => {
     loadNetworkData();
   }, []);
 
-  return { networkData, loading, error };
+  return { networkData, loading, error, loadSiteTopology };
 };
\ No newline at end of file
@@ -24,9 +24,10 @@ window.useVisNetworkVisualization = ({
     }
 
     const topology = networkData?.sites[selectedTopology];
-    if (!topology) return;
+    if (!topology || topology.d2 === undefined) return;  // D2 body still loading
 
-    const graphData = window.parseD2ToGraph(topology.d2);
+    // Prefer the graph parsed by the API, fall back to parsing in the browser
+    const graphData = topology.graph || window.parseD2ToGraph(topology.d2);
 
     // Store interfaces data for connection details
     setInterfacesData(graphData.interfaces || new Map());